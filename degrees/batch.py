@@ -0,0 +1,192 @@
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+
+import degrees
+from cache import MISSING
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Answer many degrees of separation queries at once."
+    )
+    parser.add_argument("directory",
+                        help="directory of CSV files, or a compiled snapshot")
+    parser.add_argument("queries",
+                        help="file of tab-separated source and target "
+                             "names or person ids, one pair per line")
+    parser.add_argument("--output", help="JSONL file to write (default: stdout)")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="number of worker processes (default: all cores)")
+    parser.add_argument("--cache",
+                        help="SQLite file caching paths between runs")
+    args = parser.parse_args()
+
+    print("Loading data...", file=sys.stderr)
+    degrees.load(args.directory)
+    if args.cache:
+        degrees.enable_cache(filename=args.cache)
+    print("Data loaded.", file=sys.stderr)
+
+    with open(args.queries, encoding="utf-8") as f:
+        queries = read_queries(f)
+    groups, answered = group_queries(queries)
+
+    output = open(args.output, "w") if args.output else sys.stdout
+    start = time.time()
+    count = 0
+    try:
+        for record in answered:
+            write_record(output, record)
+            count += 1
+        for records in run(args.directory, groups, args.processes):
+            # One transaction for every path found from the same source
+            if degrees.cache is not None:
+                degrees.cache.put_many([
+                    (record["source_id"], record["target_id"], record["path"])
+                    for record in records
+                ])
+            for record in records:
+                write_record(output, record)
+                count += 1
+    finally:
+        if args.output:
+            output.close()
+    elapsed = time.time() - start
+    print(f"Answered {count} queries from {len(groups)} sources "
+          f"in {elapsed:.2f} seconds.", file=sys.stderr)
+    if degrees.cache is not None:
+        stats = degrees.cache.stats
+        print(f"Cache: {stats['hits'] + stats['disk_hits']} hits, "
+              f"{stats['misses']} misses.", file=sys.stderr)
+
+
+def read_queries(lines):
+    """
+    Returns a list of (source, target) pairs of names or person ids
+    from tab-separated lines, skipping blank lines.
+    """
+    queries = []
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        fields = line.split("\t")
+        if len(fields) != 2:
+            sys.exit(f"Line {number}: expected source and target "
+                     "separated by a tab")
+        queries.append((fields[0].strip(), fields[1].strip()))
+    return queries
+
+
+def resolve(person):
+    """
+    Returns the person id for a person id or an unambiguous name.
+    Raises ValueError if no single person matches.
+    """
+    if is_person_id(person):
+        return person
+    person_ids = degrees.person_ids_for_name(person)
+    if len(person_ids) == 0:
+        raise ValueError(f"person not found: {person}")
+    if len(person_ids) > 1:
+        raise ValueError(f"ambiguous name: {person} "
+                         f"(ids {', '.join(sorted(person_ids))})")
+    return person_ids[0]
+
+
+def is_person_id(person_id):
+    """Returns whether `person_id` is the id of a loaded person."""
+    if degrees.graph is not None:
+        return degrees.graph.person_index(person_id) is not None
+    return person_id in degrees.people
+
+
+def group_queries(queries):
+    """
+    Resolves every query and groups them by source so each source is
+    searched once. Returns a dictionary mapping source ids to lists of
+    (source, target, target_id) queries, and a list of records for
+    queries answered from the cache or that could not be resolved.
+    """
+    groups = dict()
+    answered = []
+    for source, target in queries:
+        try:
+            source_id = resolve(source)
+            target_id = resolve(target)
+        except ValueError as e:
+            answered.append({"source": source, "target": target,
+                             "error": str(e)})
+            continue
+        if degrees.cache is not None:
+            path = degrees.cache.get(source_id, target_id)
+            if path is not MISSING:
+                answered.append(
+                    result(source, target, source_id, target_id, path)
+                )
+                continue
+        groups.setdefault(source_id, []).append((source, target, target_id))
+    return groups, answered
+
+
+def run(directory, groups, processes=None):
+    """
+    Yields lists of result records for each source as they complete,
+    searching independent sources in parallel.
+    """
+    tasks = list(groups.items())
+    if processes == 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield answer(task)
+        return
+
+    with multiprocessing.Pool(processes, initializer=load_worker,
+                              initargs=(directory,)) as pool:
+        yield from pool.imap_unordered(answer, tasks)
+
+
+def load_worker(directory):
+    """
+    Loads the data in a worker process, unless it was already
+    inherited from the parent process. The CSV files are parsed in
+    the worker itself, since pool workers cannot start processes.
+    """
+    if degrees.graph is None and not degrees.people:
+        degrees.load(directory, parallel=False)
+
+
+def answer(task):
+    """
+    Returns result records for every query sharing one source,
+    from a single search tree rooted at the source.
+    """
+    source_id, queries = task
+    paths = degrees.shortest_paths(
+        source_id, {target_id for _, _, target_id in queries}
+    )
+    return [result(source, target, source_id, target_id, paths[target_id])
+            for source, target, target_id in queries]
+
+
+def result(source, target, source_id, target_id, path):
+    """Returns the output record for one query."""
+    return {
+        "source": source,
+        "target": target,
+        "source_id": source_id,
+        "target_id": target_id,
+        "degrees": None if path is None else len(path),
+        "path": path
+    }
+
+
+def write_record(output, record):
+    output.write(json.dumps(record) + "\n")
+    output.flush()
+
+
+if __name__ == "__main__":
+    main()
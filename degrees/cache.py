@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import sqlite3
+from collections import OrderedDict
+
+# Returned by PathCache.get when a pair has not been cached
+MISSING = object()
+
+
+def fingerprint(directory):
+    """
+    Returns a string identifying the data in a snapshot file or a
+    directory of CSV files, which changes whenever the data does.
+    """
+    if os.path.isfile(directory):
+        filenames = [directory]
+    else:
+        filenames = [os.path.join(directory, f"{name}.csv")
+                     for name in ["people", "movies", "stars"]]
+    digest = hashlib.sha256()
+    for filename in filenames:
+        stat = os.stat(filename)
+        digest.update(f"{os.path.abspath(filename)}:{stat.st_size}:"
+                      f"{stat.st_mtime_ns}\n".encode("utf-8"))
+        with open(filename, "rb") as f:
+            digest.update(f.read(4096))
+    return digest.hexdigest()
+
+
+def reverse_path(source, path):
+    """
+    Given the (movie_id, person_id) path from `source` to a target,
+    returns the path from the target back to `source`.
+    """
+    people = [source] + [person_id for _, person_id in path]
+    return [(path[i][0], people[i]) for i in reversed(range(len(path)))]
+
+
+class PathCache():
+    """
+    Cache of shortest paths keyed by (source, target), holding the
+    most recently used `capacity` paths in memory and, if `filename`
+    is given, every path in an SQLite database.
+
+    A path cached for (A, B) also answers (B, A). Entries belong to
+    the dataset `fingerprint`; persistent entries from any other
+    dataset are deleted when the cache is opened or reset.
+    """
+
+    def __init__(self, fingerprint, capacity=10000, filename=None):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0}
+        self.db = None
+        if filename is not None:
+            self.db = sqlite3.connect(filename)
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS paths ("
+                "fingerprint TEXT, source TEXT, target TEXT, path TEXT, "
+                "PRIMARY KEY (fingerprint, source, target))"
+            )
+        self.reset(fingerprint)
+
+    def reset(self, fingerprint):
+        """Drops every entry that does not belong to `fingerprint`."""
+        self.fingerprint = fingerprint
+        self.entries.clear()
+        if self.db is not None:
+            with self.db:
+                self.db.execute("DELETE FROM paths WHERE fingerprint != ?",
+                                (fingerprint,))
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def get(self, source, target):
+        """
+        Returns the cached path from source to target, None if they
+        are cached as not connected, or MISSING.
+        """
+        key = (min(source, target), max(source, target))
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.stats["hits"] += 1
+            path = self.entries[key]
+        elif self.db is not None and (path := self.load(key)) is not MISSING:
+            self.stats["disk_hits"] += 1
+            self.remember(key, path)
+        else:
+            self.stats["misses"] += 1
+            return MISSING
+
+        if path is None or source == key[0]:
+            return path
+        return reverse_path(key[0], path)
+
+    def put(self, source, target, path):
+        """Caches the path from source to target, or None."""
+        self.put_many([(source, target, path)])
+
+    def put_many(self, paths):
+        """
+        Caches each (source, target, path) in `paths`, writing them
+        to the database in a single transaction.
+        """
+        rows = []
+        for source, target, path in paths:
+            key = (min(source, target), max(source, target))
+            if path is not None and source != key[0]:
+                path = reverse_path(source, path)
+            self.remember(key, path)
+            rows.append((self.fingerprint, key[0], key[1], json.dumps(path)))
+        if self.db is not None and rows:
+            with self.db:
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO paths VALUES (?, ?, ?, ?)", rows
+                )
+
+    def remember(self, key, path):
+        self.entries[key] = path
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def load(self, key):
+        row = self.db.execute(
+            "SELECT path FROM paths "
+            "WHERE fingerprint = ? AND source = ? AND target = ?",
+            (self.fingerprint, key[0], key[1])
+        ).fetchone()
+        if row is None:
+            return MISSING
+        path = json.loads(row[0])
+        return None if path is None else [tuple(step) for step in path]
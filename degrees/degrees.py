@@ -1,7 +1,13 @@
-import csv
+import argparse
+import math
+import os
 import sys
 
-from util import Node, StackFrontier, QueueFrontier
+from cache import MISSING, PathCache, fingerprint
+from graph import Graph
+from ingest import ingest
+from landmarks import Landmarks
+from search import ENGINES, breadth_first_tree
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,54 +18,127 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Memory-mapped person-movie graph, used instead of
+# the dictionaries above when loading a compiled snapshot
+graph = None
 
-def load_data(directory):
+# Landmark distances for the loaded snapshot, used as the
+# heuristic for the astar engine and for degree bounds
+landmarks = None
+
+# Fingerprint of the loaded data, and an optional cache of paths for it
+data_fingerprint = None
+cache = None
+
+
+def load_data(directory, parallel=True, progress=False):
     """
     Load data from CSV files into memory.
+    Returns counts of rows read and of dangling stars dropped.
     """
+    data = ingest(directory, parallel, progress)
+
     # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
+    for person_id, name, birth in zip(*data["people"]):
+        people[person_id] = {
+            "name": name,
+            "birth": birth,
+            "movies": set()
+        }
+        key = name.lower()
+        if key not in names:
+            names[key] = {person_id}
+        else:
+            names[key].add(person_id)
 
     # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
+    for movie_id, title, year in zip(*data["movies"]):
+        movies[movie_id] = {
+            "title": title,
+            "year": year,
+            "stars": set()
+        }
 
     # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+    for person_id, movie_id in zip(*data["stars"]):
+        people[person_id]["movies"].add(movie_id)
+        movies[movie_id]["stars"].add(person_id)
+
+    return data["stats"]
+
+
+def load_snapshot(filename):
+    """
+    Load a snapshot compiled by graph.py by memory-mapping it,
+    without building any dictionaries.
+    """
+    global graph
+    graph = Graph(filename)
+
+
+def load_landmarks(filename):
+    """
+    Load landmark distances built by landmarks.py for the loaded snapshot.
+    """
+    global landmarks
+    if graph is None:
+        raise ValueError("landmarks require a compiled snapshot")
+    landmarks = Landmarks(filename, graph)
+
+
+def load(directory, parallel=True, progress=False):
+    """
+    Load a compiled snapshot if `directory` is a file,
+    otherwise load the CSV files in `directory`, parsing them in
+    parallel worker processes if `parallel` is true.
+    """
+    global data_fingerprint
+    if os.path.isfile(directory):
+        load_snapshot(directory)
+    else:
+        load_data(directory, parallel, progress)
+    data_fingerprint = fingerprint(directory)
+    if cache is not None:
+        cache.reset(data_fingerprint)
+
+
+def enable_cache(capacity=10000, filename=None):
+    """
+    Cache the results of shortest_path for the loaded data, keeping up
+    to `capacity` paths in memory and, if `filename` is given, every
+    path in an SQLite database there.
+    """
+    global cache
+    if cache is not None:
+        cache.close()
+    cache = PathCache(data_fingerprint, capacity, filename)
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory", nargs="?", default="large",
+                        help="directory of CSV files, or a compiled snapshot")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="bfs",
+                        help="search engine used to find the path")
+    parser.add_argument("--compare", action="store_true",
+                        help="report nodes expanded by every engine")
+    parser.add_argument("--landmarks",
+                        help="landmark file built by landmarks.py")
+    parser.add_argument("--cache",
+                        help="SQLite file caching paths between runs")
+    args = parser.parse_args()
+    directory = args.directory
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load(directory, progress=True)
+    if args.landmarks:
+        try:
+            load_landmarks(args.landmarks)
+        except ValueError as e:
+            sys.exit(str(e))
+    if args.cache:
+        enable_cache(filename=args.cache)
     print("Data loaded.")
 
     source = person_id_for_name(input("Name: "))
@@ -69,7 +148,25 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    if landmarks is not None:
+        lower, upper = degree_bounds(source, target)
+        if lower == math.inf:
+            print("Landmarks: not connected.")
+        elif upper == math.inf:
+            print(f"Landmarks: at least {lower} degrees of separation.")
+        else:
+            print(f"Landmarks: {lower} to {upper} degrees of separation.")
+
+    if args.compare:
+        for engine in sorted(ENGINES):
+            stats = dict()
+            path = find_path(source, target, engine, stats)
+            length = "not connected" if path is None else len(path)
+            counters = ", ".join(f"{value} {counter.replace('_', ' ')}"
+                                 for counter, value in stats.items())
+            print(f"{engine}: {counters}, degrees: {length}")
+
+    path = shortest_path(source, target, args.engine)
 
     if path is None:
         print("Not connected.")
@@ -78,73 +175,109 @@ def main():
         print(f"{degrees} degrees of separation.")
         path = [(None, source)] + path
         for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
+            person1 = person_for_id(path[i][1])["name"]
+            person2 = person_for_id(path[i + 1][1])["name"]
+            movie = movie_for_id(path[i + 1][0])["title"]
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, engine="bfs", stats=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
     If no possible path, returns None.
+
+    `engine` names the search in search.ENGINES to use. If `stats` is
+    a dictionary, search counters such as "expanded" are added to it.
+    If a cache is enabled, cached paths are returned without searching.
     """
+    if cache is not None:
+        path = cache.get(source, target)
+        if path is not MISSING:
+            return path
 
-    # TODO
-    # Initialize frontier to just the starting position
-    start = Node(state=source, parent=None, action=None)
-    frontier = QueueFrontier()
-    frontier.add(start)
+    path = find_path(source, target, engine, stats)
+    if cache is not None:
+        cache.put(source, target, path)
+    return path
+
+
+def find_path(source, target, engine="bfs", stats=None):
+    """
+    Searches for the shortest path from source to target with `engine`,
+    without consulting the cache. See shortest_path.
+    """
+    search = ENGINES[engine]
 
-    # Initialize an empty explored set
-    explored = set()
+    # Search the snapshot by index and translate the path back to ids
+    if graph is not None:
+        source = graph.person_index(source)
+        target = graph.person_index(target)
+        options = dict()
+        if engine == "astar" and landmarks is not None:
+            options["heuristic"] = landmarks.heuristic(target)
+        elif engine == "movies":
+            options["movies_for"] = graph.movies_for
+            options["stars_for"] = graph.stars_for
+        path = search(source, target, graph.neighbors, stats, **options)
+        if path is None:
+            return None
+        return [(graph.movie_id(movie), graph.person_id(person))
+                for movie, person in path]
 
-    # Keep looping until solution found
-    while True:
+    options = dict()
+    if engine == "movies":
+        options["movies_for"] = lambda person_id: people[person_id]["movies"]
+        options["stars_for"] = lambda movie_id: movies[movie_id]["stars"]
+    return search(source, target, neighbors_for_person, stats, **options)
 
-        # If nothing left in frontier, then no path
-        if frontier.empty():
-            raise Exception("no solution")
 
-        # Choose a node from the frontier
-        node = frontier.remove()
+def shortest_paths(source, targets, stats=None):
+    """
+    Returns a dictionary mapping each of `targets` to the shortest
+    list of (movie_id, person_id) pairs from the source, or None if
+    not connected, using a single search from the source.
+    """
+    if graph is not None:
+        indices = {graph.person_index(target): target for target in targets}
+        paths = breadth_first_tree(graph.person_index(source), indices,
+                                   graph.neighbors, stats)
+        return {
+            indices[target]: None if path is None else [
+                (graph.movie_id(movie), graph.person_id(person))
+                for movie, person in path
+            ]
+            for target, path in paths.items()
+        }
 
-        # Mark node as explored
-        explored.add(node.state)
+    return breadth_first_tree(source, targets, neighbors_for_person, stats)
 
-        # Check the source's node
-        for movie_id, person_id in neighbors_for_person(node.state):
-            if person_id == target:
-                solutions = []
-                # append the current node
-                solutions.append((movie_id, person_id))
-                # if node parent exist, keep looking for the parent node
-                while node.parent is not None:
-                    solutions.append((node.action, node.state))
-                    node = node.parent
 
-                solutions.reverse()
-                return solutions
+def degree_bounds(source, target):
+    """
+    Returns (lower, upper) bounds on the degrees of separation between
+    two person ids from the loaded landmarks, without searching.
+    Either bound may be math.inf.
+    """
+    if landmarks is None:
+        raise ValueError("no landmarks loaded")
+    return landmarks.bounds(graph.person_index(source),
+                            graph.person_index(target))
 
-            # Add child node to frontier
-            if not frontier.contains_state(person_id) and person_id not in explored:
-                child = Node(state=person_id, parent=node, action=movie_id)
-                frontier.add(child)
 
 def person_id_for_name(name):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
     """
-    person_ids = list(names.get(name.lower(), set()))
+    person_ids = person_ids_for_name(name)
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
         for person_id in person_ids:
-            person = people[person_id]
+            person = person_for_id(person_id)
             name = person["name"]
             birth = person["birth"]
             print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
@@ -159,11 +292,50 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def person_ids_for_name(name):
+    """
+    Returns a list of the IMDB ids of every person with a given name.
+    """
+    if graph is not None:
+        return [graph.person_id(person) for person in graph.people_named(name)]
+    return list(names.get(name.lower(), set()))
+
+
+def person_for_id(person_id):
+    """
+    Returns a dictionary with the name and birth of a person.
+    """
+    if graph is not None:
+        person = graph.person_index(person_id)
+        return {
+            "name": graph.person_name(person),
+            "birth": graph.person_birth(person)
+        }
+    return people[person_id]
+
+
+def movie_for_id(movie_id):
+    """
+    Returns a dictionary with the title and year of a movie.
+    """
+    if graph is not None:
+        movie = graph.movie_index(movie_id)
+        return {
+            "title": graph.movie_title(movie),
+            "year": graph.movie_year(movie)
+        }
+    return movies[movie_id]
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return {(graph.movie_id(movie), graph.person_id(person))
+                for movie, person in graph.neighbors(
+                    graph.person_index(person_id))}
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
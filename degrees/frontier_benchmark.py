@@ -0,0 +1,64 @@
+import sys
+import time
+
+from util import (Node, StackFrontier, QueueFrontier,
+                  DequeStackFrontier, DequeQueueFrontier)
+
+FRONTIERS = [StackFrontier, QueueFrontier,
+             DequeStackFrontier, DequeQueueFrontier]
+
+# The list-backed frontiers are quadratic, so stop timing them here
+LIST_LIMIT = 2 ** 15
+
+# Number of contains_state lookups timed at each size
+LOOKUPS = 1000
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python frontier_benchmark.py [max_size]")
+    max_size = int(sys.argv[1]) if len(sys.argv) == 2 else 2 ** 22
+
+    print(f"{'frontier':<20}{'size':>10}"
+          f"{'add ns':>10}{'contains ns':>14}{'remove ns':>12}")
+    size = 2 ** 10
+    while size <= max_size:
+        for frontier in FRONTIERS:
+            if not frontier.__name__.startswith("Deque") and size > LIST_LIMIT:
+                continue
+            add, contains, remove = benchmark(frontier, size)
+            print(f"{frontier.__name__:<20}{size:>10}"
+                  f"{add:>10.0f}{contains:>14.0f}{remove:>12.0f}")
+        size *= 4
+
+
+def benchmark(frontier_class, size):
+    """
+    Fills a frontier with `size` nodes, checks membership of states
+    spread across it, then empties it. Returns the average time of
+    each operation in nanoseconds.
+    """
+    frontier = frontier_class()
+    nodes = [Node(state=i, parent=None, action=None) for i in range(size)]
+
+    start = time.perf_counter_ns()
+    for node in nodes:
+        frontier.add(node)
+    add = (time.perf_counter_ns() - start) / size
+
+    lookups = [i * size // LOOKUPS for i in range(LOOKUPS)]
+    start = time.perf_counter_ns()
+    for state in lookups:
+        frontier.contains_state(state)
+    contains = (time.perf_counter_ns() - start) / LOOKUPS
+
+    start = time.perf_counter_ns()
+    while not frontier.empty():
+        frontier.remove()
+    remove = (time.perf_counter_ns() - start) / size
+
+    return add, contains, remove
+
+
+if __name__ == "__main__":
+    main()
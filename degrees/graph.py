@@ -0,0 +1,295 @@
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+
+from ingest import ingest
+
+# Identifies a snapshot file and its layout version
+MAGIC = b"DEGREES1"
+
+# Sections stored in a snapshot, in file order
+SECTIONS = [
+    "person_offsets",     # int32, people + 1, offsets into person_movies
+    "person_movies",      # int32, movie index for each starring role
+    "movie_offsets",      # int32, movies + 1, offsets into movie_stars
+    "movie_stars",        # int32, person index for each starring role
+    "person_name",        # int32, index into the name table for each person
+    "name_offsets",       # int32, names + 1, offsets into name_people
+    "name_people",        # int32, person indices sharing each name
+    "person_ids.offsets", "person_ids.blob",
+    "person_births.offsets", "person_births.blob",
+    "movie_ids.offsets", "movie_ids.blob",
+    "movie_titles.offsets", "movie_titles.blob",
+    "movie_years.offsets", "movie_years.blob",
+    "names.offsets", "names.blob",
+]
+
+# Magic, byte order marker, then (offset, length) in bytes for each section
+HEADER = struct.Struct(f"=8sI{2 * len(SECTIONS)}Q")
+BYTE_ORDER = 0x01020304
+
+
+class StringTable():
+    """
+    Read-only list of strings stored as a single UTF-8 blob
+    and an int32 array of offsets into it.
+    """
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+
+def pack_strings(strings):
+    """
+    Return (offsets, blob) encoding a list of strings as a StringTable.
+    """
+    offsets = array("i", [0])
+    blob = bytearray()
+    for s in strings:
+        blob += s.encode("utf-8")
+        offsets.append(len(blob))
+    return offsets, bytes(blob)
+
+
+def compile_snapshot(directory, filename, progress=False):
+    """
+    Compile people.csv, movies.csv and stars.csv from `directory`
+    into a binary snapshot at `filename`.
+
+    People and movies get dense integer indices in sorted order of
+    their IMDB ids, starring roles are stored in both directions as
+    CSR offset arrays, and names are interned into a sorted table.
+    Stars referring to unknown people or movies are dropped.
+    If `progress` is true, reports rows read per second.
+    """
+
+    data = ingest(directory, progress=progress)
+
+    # Order people and movies by id
+    rows = sorted(zip(*data["people"]))
+    person_ids = [row[0] for row in rows]
+    person_names = [row[1] for row in rows]
+    person_births = [row[2] for row in rows]
+
+    rows = sorted(zip(*data["movies"]))
+    movie_ids = [row[0] for row in rows]
+    movie_titles = [row[1] for row in rows]
+    movie_years = [row[2] for row in rows]
+    del rows
+
+    # Convert stars to pairs of dense indices
+    person_index = {person_id: i for i, person_id in enumerate(person_ids)}
+    movie_index = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+    roles = set(zip(map(person_index.__getitem__, data["stars"][0]),
+                    map(movie_index.__getitem__, data["stars"][1])))
+    del person_index, movie_index, data
+
+    sections = dict()
+    sections["person_offsets"], sections["person_movies"] = csr(
+        len(person_ids), sorted(roles)
+    )
+    sections["movie_offsets"], sections["movie_stars"] = csr(
+        len(movie_ids), sorted((movie, person) for person, movie in roles)
+    )
+    del roles
+
+    # Intern names, sorted case-insensitively so lookups can bisect
+    names = sorted(set(person_names), key=lambda name: (name.lower(), name))
+    name_index = {name: i for i, name in enumerate(names)}
+    person_name = array("i", (name_index[name] for name in person_names))
+    sections["person_name"] = person_name
+    sections["name_offsets"], sections["name_people"] = csr(
+        len(names), sorted((n, person) for person, n in enumerate(person_name))
+    )
+    del name_index, person_names
+
+    for key, strings in [("person_ids", person_ids),
+                         ("person_births", person_births),
+                         ("movie_ids", movie_ids),
+                         ("movie_titles", movie_titles),
+                         ("movie_years", movie_years),
+                         ("names", names)]:
+        sections[f"{key}.offsets"], sections[f"{key}.blob"] = (
+            pack_strings(strings)
+        )
+
+    # Write the header followed by each section, aligned to 8 bytes
+    with open(filename, "wb") as f:
+        f.write(bytes(HEADER.size))
+        layout = []
+        for key in SECTIONS:
+            f.write(bytes(-f.tell() % 8))
+            data = sections[key]
+            layout.extend([f.tell(), len(data) * getattr(data, "itemsize", 1)])
+            f.write(data)
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, BYTE_ORDER, *layout))
+
+
+def csr(count, pairs):
+    """
+    Given sorted (row, column) pairs, return (offsets, columns) arrays
+    where the columns of `row` are columns[offsets[row]:offsets[row + 1]].
+    """
+    offsets = array("i", bytes(4 * (count + 1)))
+    columns = array("i")
+    for row, column in pairs:
+        offsets[row + 1] += 1
+        columns.append(column)
+    for i in range(count):
+        offsets[i + 1] += offsets[i]
+    return offsets, columns
+
+
+class Graph():
+    """
+    Person-movie graph memory-mapped from a snapshot
+    written by `compile_snapshot`.
+
+    People and movies are referred to by their dense integer index;
+    use `person_index` and `person_id` to convert to and from IMDB ids.
+    """
+
+    def __init__(self, filename):
+        with open(filename, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = view = memoryview(self.map)
+        magic, order, *layout = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError(f"{filename} is not a degrees snapshot")
+        if order != BYTE_ORDER:
+            raise ValueError(f"{filename} was written on a machine "
+                             "with a different byte order")
+
+        self.sections = dict()
+        for i, key in enumerate(SECTIONS):
+            start, length = layout[2 * i], layout[2 * i + 1]
+            section = view[start:start + length]
+            if not key.endswith(".blob"):
+                section = section.cast("i")
+            self.sections[key] = section
+
+        self.person_offsets = self.sections["person_offsets"]
+        self.person_movies = self.sections["person_movies"]
+        self.movie_offsets = self.sections["movie_offsets"]
+        self.movie_stars = self.sections["movie_stars"]
+        self.person_name_index = self.sections["person_name"]
+        self.name_offsets = self.sections["name_offsets"]
+        self.name_people = self.sections["name_people"]
+        self.person_ids = self.strings("person_ids")
+        self.person_births = self.strings("person_births")
+        self.movie_ids = self.strings("movie_ids")
+        self.movie_titles = self.strings("movie_titles")
+        self.movie_years = self.strings("movie_years")
+        self.names = self.strings("names")
+
+        self.person_count = len(self.person_ids)
+        self.movie_count = len(self.movie_ids)
+
+    def strings(self, key):
+        return StringTable(self.sections[f"{key}.offsets"],
+                           self.sections[f"{key}.blob"])
+
+    def close(self):
+        """Release the memory map."""
+        for section in self.sections.values():
+            section.release()
+        self.sections.clear()
+        self.view.release()
+        self.map.close()
+
+    def person_index(self, person_id):
+        """Returns the index for an IMDB person id, or None."""
+        return find(self.person_ids, person_id)
+
+    def movie_index(self, movie_id):
+        """Returns the index for an IMDB movie id, or None."""
+        return find(self.movie_ids, movie_id)
+
+    def person_id(self, person):
+        return self.person_ids[person]
+
+    def movie_id(self, movie):
+        return self.movie_ids[movie]
+
+    def person_name(self, person):
+        return self.names[self.person_name_index[person]]
+
+    def person_birth(self, person):
+        return self.person_births[person]
+
+    def movie_title(self, movie):
+        return self.movie_titles[movie]
+
+    def movie_year(self, movie):
+        return self.movie_years[movie]
+
+    def people_named(self, name):
+        """
+        Returns the indices of all people whose name matches `name`,
+        ignoring case.
+        """
+        name = name.lower()
+        lower = bisect_left(range(len(self.names)), name,
+                            key=lambda i: self.names[i].lower())
+        people = []
+        while lower < len(self.names) and self.names[lower].lower() == name:
+            start, end = self.name_offsets[lower], self.name_offsets[lower + 1]
+            people.extend(self.name_people[start:end])
+            lower += 1
+        return people
+
+    def movies_for(self, person):
+        """Returns the indices of movies a person starred in."""
+        offsets = self.person_offsets
+        return self.person_movies[offsets[person]:offsets[person + 1]]
+
+    def stars_for(self, movie):
+        """Returns the indices of people who starred in a movie."""
+        offsets = self.movie_offsets
+        return self.movie_stars[offsets[movie]:offsets[movie + 1]]
+
+    def neighbors(self, person):
+        """
+        Returns (movie, person) index pairs for people
+        who starred with a given person.
+        """
+        neighbors = set()
+        for movie in self.movies_for(person):
+            for star in self.stars_for(movie):
+                neighbors.add((movie, star))
+        return neighbors
+
+
+def find(table, key):
+    """
+    Returns the position of `key` in a sorted StringTable, or None.
+    """
+    i = bisect_left(range(len(table)), key, key=table.__getitem__)
+    if i < len(table) and table[i] == key:
+        return i
+    return None
+
+
+def main():
+    if len(sys.argv) != 3:
+        sys.exit("Usage: python graph.py directory snapshot")
+    print("Compiling snapshot...")
+    compile_snapshot(sys.argv[1], sys.argv[2], progress=True)
+    graph = Graph(sys.argv[2])
+    print(f"Compiled {graph.person_count} people "
+          f"and {graph.movie_count} movies.")
+    graph.close()
+
+
+if __name__ == "__main__":
+    main()
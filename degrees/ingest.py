@@ -0,0 +1,96 @@
+import csv
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Rows between progress reports
+PROGRESS_INTERVAL = 1000000
+
+
+def read_table(filename, columns, progress=False):
+    """
+    Stream a CSV file, returning a list of values for each of `columns`
+    with repeated strings interned, and the number of rows read.
+    Rows are read one at a time with csv.reader rather than building
+    a dictionary for each one.
+    """
+    start = time.time()
+    values = [[] for _ in columns]
+    rows = 0
+    with open(filename, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        positions = [header.index(column) for column in columns]
+        appends = [column.append for column in values]
+        for row in reader:
+            # Skip blank lines, as csv.DictReader does
+            if not row:
+                continue
+            for append, position in zip(appends, positions):
+                append(sys.intern(row[position]))
+            rows += 1
+            if progress and rows % PROGRESS_INTERVAL == 0:
+                report(filename, rows, start)
+    if progress:
+        report(filename, rows, start)
+    return values, rows
+
+
+def report(filename, rows, start):
+    elapsed = max(time.time() - start, 1e-9)
+    sys.stderr.write(f"{filename}: {rows} rows, {rows / elapsed:.0f} rows/s\n")
+    sys.stderr.flush()
+
+
+def ingest(directory, parallel=True, progress=False):
+    """
+    Read people.csv, movies.csv and stars.csv from `directory`,
+    parsing the three files in parallel worker processes.
+
+    Returns a dictionary with:
+        "people": [ids, names, births]
+        "movies": [ids, titles, years]
+        "stars": [person_ids, movie_ids], only for known people and movies
+        "stats": counts of rows read and of dangling stars dropped
+    """
+    tables = [
+        (f"{directory}/people.csv", ["id", "name", "birth"]),
+        (f"{directory}/movies.csv", ["id", "title", "year"]),
+        (f"{directory}/stars.csv", ["person_id", "movie_id"]),
+    ]
+    if parallel:
+        with ProcessPoolExecutor(len(tables)) as executor:
+            futures = [executor.submit(read_table, filename, columns, progress)
+                       for filename, columns in tables]
+            results = [future.result() for future in futures]
+    else:
+        results = [read_table(filename, columns, progress)
+                   for filename, columns in tables]
+    (people, people_rows), (movies, movie_rows), (stars, star_rows) = results
+
+    # Drop stars that refer to people or movies that do not exist
+    person_ids = set(people[0])
+    movie_ids = set(movies[0])
+    kept = [[], []]
+    dangling = 0
+    for person_id, movie_id in zip(*stars):
+        if person_id in person_ids and movie_id in movie_ids:
+            kept[0].append(person_id)
+            kept[1].append(movie_id)
+        else:
+            dangling += 1
+    if progress and dangling:
+        print(f"Dropped {dangling} stars for unknown people or movies",
+              file=sys.stderr, flush=True)
+
+    return {
+        "people": people,
+        "movies": movies,
+        "stars": kept,
+        "stats": {
+            "people": people_rows,
+            "movies": movie_rows,
+            "stars": star_rows,
+            "dangling_stars": dangling
+        }
+    }
@@ -0,0 +1,169 @@
+import argparse
+import math
+import mmap
+import struct
+
+from graph import Graph
+
+# Identifies a landmark file and its layout version
+MAGIC = b"LANDMRK1"
+
+# Magic, landmark count, and the people and roles of the snapshot
+HEADER = struct.Struct("=8sIII")
+
+# Distance stored for people a landmark cannot reach; real distances
+# are capped one below, which keeps the bounds admissible
+UNREACHABLE = 255
+
+
+def build_landmarks(graph, count, filename):
+    """
+    Choose `count` landmarks among the best-connected people in `graph`
+    and write their breadth-first distance to every person to `filename`.
+    """
+    landmarks = choose_landmarks(graph, count)
+    with open(filename, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(landmarks),
+                            graph.person_count, len(graph.movie_stars)))
+        f.write(struct.pack(f"={len(landmarks)}i", *landmarks))
+        for landmark in landmarks:
+            f.write(distances_from(graph, landmark))
+
+
+def choose_landmarks(graph, count):
+    """
+    Returns the `count` people with the most co-star roles,
+    skipping people who starred with an already chosen landmark
+    so the landmarks are spread across the graph.
+    """
+    degrees = [
+        sum(len(graph.stars_for(movie)) - 1
+            for movie in graph.movies_for(person))
+        for person in range(graph.person_count)
+    ]
+    ranked = sorted(range(graph.person_count), key=degrees.__getitem__,
+                    reverse=True)
+    landmarks = []
+    covered = set()
+    for person in ranked:
+        if len(landmarks) == count or degrees[person] == 0:
+            break
+        if person in covered:
+            continue
+        landmarks.append(person)
+        covered.update(star for _, star in graph.neighbors(person))
+    return landmarks
+
+
+def distances_from(graph, landmark):
+    """
+    Returns a bytearray of the number of degrees between `landmark`
+    and every person, scanning each movie's cast at most once.
+    """
+    distances = bytearray([UNREACHABLE]) * graph.person_count
+    scanned = bytearray(graph.movie_count)
+    distances[landmark] = 0
+    frontier = [landmark]
+    depth = 0
+    while frontier:
+        depth = min(depth + 1, UNREACHABLE - 1)
+        layer = []
+        for person in frontier:
+            for movie in graph.movies_for(person):
+                if scanned[movie]:
+                    continue
+                scanned[movie] = 1
+                for star in graph.stars_for(movie):
+                    if distances[star] == UNREACHABLE:
+                        distances[star] = depth
+                        layer.append(star)
+        frontier = layer
+    return distances
+
+
+class Landmarks():
+    """
+    Landmark distances memory-mapped from a file written by
+    `build_landmarks`, giving lower and upper bounds on the
+    degrees between any two people without searching.
+    """
+
+    def __init__(self, filename, graph):
+        with open(filename, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, person_count, roles = HEADER.unpack_from(self.map)
+        if magic != MAGIC:
+            raise ValueError(f"{filename} is not a landmark file")
+        if (person_count, roles) != (graph.person_count,
+                                     len(graph.movie_stars)):
+            raise ValueError(f"{filename} was built from a different snapshot")
+
+        start = HEADER.size
+        self.landmarks = struct.unpack_from(f"={count}i", self.map, start)
+        start += 4 * count
+        view = memoryview(self.map)
+        self.distances = [
+            view[start + i * person_count:start + (i + 1) * person_count]
+            for i in range(count)
+        ]
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper) bounds on the degrees between the people
+        with indices `source` and `target`. Lower is math.inf if they are
+        known not to be connected, upper is math.inf if no landmark
+        reaches both.
+        """
+        lower = 0
+        upper = math.inf
+        for distances in self.distances:
+            a, b = distances[source], distances[target]
+            if a == UNREACHABLE and b == UNREACHABLE:
+                continue
+            if a == UNREACHABLE or b == UNREACHABLE:
+                return math.inf, math.inf
+            lower = max(lower, abs(a - b))
+            upper = min(upper, a + b)
+        return lower, upper
+
+    def heuristic(self, target):
+        """
+        Returns a function giving an admissible estimate of
+        the degrees from a person index to `target`.
+        """
+        targets = [(distances, distances[target])
+                   for distances in self.distances]
+
+        def estimate(person):
+            bound = 0
+            for distances, b in targets:
+                a = distances[person]
+                if a == UNREACHABLE or b == UNREACHABLE:
+                    if a != b:
+                        return math.inf
+                    continue
+                if abs(a - b) > bound:
+                    bound = abs(a - b)
+            return bound
+        return estimate
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Precompute landmark distances for a degrees snapshot."
+    )
+    parser.add_argument("snapshot", help="snapshot compiled by graph.py")
+    parser.add_argument("output", help="landmark file to write")
+    parser.add_argument("--count", type=int, default=32,
+                        help="number of landmarks (default: 32)")
+    args = parser.parse_args()
+
+    graph = Graph(args.snapshot)
+    print("Building landmarks...")
+    build_landmarks(graph, args.count, args.output)
+    landmarks = Landmarks(args.output, graph)
+    print(f"Built {len(landmarks.landmarks)} landmarks.")
+
+
+if __name__ == "__main__":
+    main()
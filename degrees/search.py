@@ -0,0 +1,312 @@
+import heapq
+import itertools
+import math
+
+from util import Node, DequeQueueFrontier
+
+
+def breadth_first_search(source, target, neighbors, stats=None):
+    """
+    Returns the shortest list of (action, state) pairs that connect
+    the source to the target, where `neighbors(state)` returns the
+    (action, state) pairs reachable from a state.
+
+    If no possible path, returns None. If `stats` is a dictionary,
+    the number of expanded states is added to stats["expanded"].
+    """
+    stats = stats if stats is not None else dict()
+    stats.setdefault("expanded", 0)
+
+    if source == target:
+        return []
+
+    # Initialize frontier to just the starting position
+    start = Node(state=source, parent=None, action=None)
+    frontier = DequeQueueFrontier()
+    frontier.add(start)
+
+    # Initialize an empty explored set
+    explored = set()
+
+    # Keep looping until solution found
+    while True:
+
+        # If nothing left in frontier, then no path
+        if frontier.empty():
+            return None
+
+        # Choose a node from the frontier
+        node = frontier.remove()
+
+        # Mark node as explored
+        explored.add(node.state)
+        stats["expanded"] += 1
+
+        # Check the source's node
+        for action, state in neighbors(node.state):
+            if state == target:
+                solutions = []
+                # append the current node
+                solutions.append((action, state))
+                # if node parent exist, keep looking for the parent node
+                while node.parent is not None:
+                    solutions.append((node.action, node.state))
+                    node = node.parent
+
+                solutions.reverse()
+                return solutions
+
+            # Add child node to frontier
+            if not frontier.contains_state(state) and state not in explored:
+                child = Node(state=state, parent=node, action=action)
+                frontier.add(child)
+
+
+def bidirectional_search(source, target, neighbors, stats=None):
+    """
+    Returns the shortest list of (action, state) pairs that connect
+    the source to the target, searching breadth-first from both ends
+    and always expanding the smaller frontier by one whole layer.
+
+    `neighbors` must be symmetric: if it returns (action, b) for a,
+    it must return (action, a) for b. Arguments and return value
+    are the same as for `breadth_first_search`.
+    """
+    stats = stats if stats is not None else dict()
+    stats.setdefault("expanded", 0)
+
+    if source == target:
+        return []
+
+    # Each side maps a reached state to (action, previous state, depth)
+    forward = {source: (None, None, 0)}
+    backward = {target: (None, None, 0)}
+    forward_frontier = [source]
+    backward_frontier = [target]
+
+    while forward_frontier and backward_frontier:
+
+        # Expand the side with fewer states waiting
+        if len(forward_frontier) <= len(backward_frontier):
+            forward_frontier, meeting = expand_layer(
+                forward_frontier, forward, backward, neighbors, stats
+            )
+        else:
+            backward_frontier, meeting = expand_layer(
+                backward_frontier, backward, forward, neighbors, stats
+            )
+
+        if meeting is not None:
+            return join_path(meeting, forward, backward)
+
+    return None
+
+
+def expand_layer(frontier, reached, opposite, neighbors, stats):
+    """
+    Expands every state in `frontier`, recording newly reached states
+    in `reached`. Returns the next frontier and the state where the
+    shortest path meets the `opposite` search, or None.
+    """
+    layer = []
+    meeting = None
+    best = None
+    for state in frontier:
+        stats["expanded"] += 1
+        depth = reached[state][2] + 1
+        for action, neighbor in neighbors(state):
+            if neighbor in reached:
+                continue
+            reached[neighbor] = (action, state, depth)
+            layer.append(neighbor)
+
+            # Finish the layer so the shortest of the meetings is chosen
+            if neighbor in opposite:
+                length = depth + opposite[neighbor][2]
+                if best is None or length < best:
+                    best = length
+                    meeting = neighbor
+    return layer, meeting
+
+
+def join_path(meeting, forward, backward):
+    """
+    Returns the (action, state) path through `meeting`
+    from the forward and backward search trees.
+    """
+    path = []
+    state = meeting
+    while forward[state][1] is not None:
+        action, previous, _ = forward[state]
+        path.append((action, state))
+        state = previous
+    path.reverse()
+
+    state = meeting
+    while backward[state][1] is not None:
+        action, following, _ = backward[state]
+        path.append((action, following))
+        state = following
+    return path
+
+
+def breadth_first_tree(source, targets, neighbors, stats=None):
+    """
+    Returns a dictionary mapping each state in `targets` to its
+    shortest list of (action, state) pairs from the source, or None
+    if it cannot be reached, sharing one breadth-first search tree
+    between all targets. Stops once every target has been reached.
+    """
+    stats = stats if stats is not None else dict()
+    stats.setdefault("expanded", 0)
+
+    # Maps each reached state to (action, previous state)
+    reached = {source: (None, None)}
+    remaining = set(targets) - {source}
+    frontier = [source]
+    while remaining and frontier:
+        layer = []
+        for state in frontier:
+            stats["expanded"] += 1
+            for action, neighbor in neighbors(state):
+                if neighbor not in reached:
+                    reached[neighbor] = (action, state)
+                    remaining.discard(neighbor)
+                    layer.append(neighbor)
+        frontier = layer
+
+    paths = dict()
+    for target in targets:
+        if target not in reached:
+            paths[target] = None
+            continue
+        path = []
+        state = target
+        while state != source:
+            action, previous = reached[state]
+            path.append((action, state))
+            state = previous
+        path.reverse()
+        paths[target] = path
+    return paths
+
+
+def astar_search(source, target, neighbors, stats=None, heuristic=None):
+    """
+    Returns the shortest list of (action, state) pairs that connect
+    the source to the target, expanding states in order of path length
+    plus `heuristic(state)`, a consistent estimate of the remaining
+    length such as the landmark bounds in landmarks.py.
+
+    Without a heuristic this is a uniform-cost search. Arguments and
+    return value are otherwise the same as for `breadth_first_search`.
+    """
+    stats = stats if stats is not None else dict()
+    stats.setdefault("expanded", 0)
+    if heuristic is None:
+        def heuristic(state):
+            return 0
+
+    estimate = heuristic(source)
+    if estimate == math.inf:
+        return None
+
+    # Ties on estimated length prefer longer paths, then insertion order
+    counter = itertools.count()
+    frontier = [(estimate, 0, next(counter), source)]
+    reached = {source: (None, None, 0)}
+    explored = set()
+
+    while frontier:
+        _, length, _, state = heapq.heappop(frontier)
+        length = -length
+        if state in explored:
+            continue
+        if state == target:
+            path = []
+            while state != source:
+                action, previous, _ = reached[state]
+                path.append((action, state))
+                state = previous
+            path.reverse()
+            return path
+
+        explored.add(state)
+        stats["expanded"] += 1
+        for action, neighbor in neighbors(state):
+            if neighbor in explored:
+                continue
+            if neighbor in reached and reached[neighbor][2] <= length + 1:
+                continue
+            estimate = heuristic(neighbor)
+            if estimate == math.inf:
+                continue
+            reached[neighbor] = (action, state, length + 1)
+            heapq.heappush(frontier, (length + 1 + estimate, -(length + 1),
+                                      next(counter), neighbor))
+
+    return None
+
+
+def movie_search(source, target, neighbors, stats=None,
+                 movies_for=None, stars_for=None):
+    """
+    Returns the shortest list of (movie, person) pairs that connect
+    the source to the target, treating each movie as a hyperedge
+    joining its whole cast.
+
+    Instead of `neighbors`, uses `movies_for(person)` and
+    `stars_for(movie)`, and scans each movie's cast at most once per
+    search rather than once for every cast member expanded. If `stats`
+    is a dictionary, "expanded", "cast_scans" and "cast_scans_skipped"
+    counters are added to it.
+    """
+    stats = stats if stats is not None else dict()
+    for counter in ["expanded", "cast_scans", "cast_scans_skipped"]:
+        stats.setdefault(counter, 0)
+
+    if source == target:
+        return []
+
+    # Maps each reached person to (movie, previous person)
+    reached = {source: (None, None)}
+    scanned = set()
+    frontier = [source]
+    while frontier:
+        layer = []
+        for person in frontier:
+            stats["expanded"] += 1
+            for movie in movies_for(person):
+
+                # Everyone in a scanned cast was reached at least as early
+                if movie in scanned:
+                    stats["cast_scans_skipped"] += 1
+                    continue
+                scanned.add(movie)
+                stats["cast_scans"] += 1
+
+                for star in stars_for(movie):
+                    if star in reached:
+                        continue
+                    reached[star] = (movie, person)
+                    if star == target:
+                        path = []
+                        while star != source:
+                            movie, previous = reached[star]
+                            path.append((movie, star))
+                            star = previous
+                        path.reverse()
+                        return path
+                    layer.append(star)
+        frontier = layer
+
+    return None
+
+
+# Search engines selectable by name
+ENGINES = {
+    "astar": astar_search,
+    "bfs": breadth_first_search,
+    "bidirectional": bidirectional_search,
+    "movies": movie_search,
+}
@@ -0,0 +1,123 @@
+import argparse
+import csv
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+from elimination import compile_plan, family_shape, probabilities, run_plan
+from heredity import compile_family, load_data
+
+# Families handed to a worker process at a time
+BATCH_SIZE = 64
+
+COLUMNS = ["family", "person", "gene_2", "gene_1", "gene_0", "trait"]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Infer gene and trait probabilities for many families."
+    )
+    parser.add_argument("families",
+                        help="directory of family CSV files, or a manifest "
+                             "listing one family CSV file per line")
+    parser.add_argument("--output", help="CSV file to write (default: stdout)")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="number of worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    filenames = family_files(args.families)
+    start = time.time()
+    groups = group_families(filenames)
+
+    output = open(args.output, "w", newline="") if args.output else sys.stdout
+    count = 0
+    try:
+        writer = csv.writer(output)
+        writer.writerow(COLUMNS)
+        for rows in run(groups, args.processes):
+            writer.writerows(rows)
+            count += 1
+    finally:
+        if args.output:
+            output.close()
+    elapsed = max(time.time() - start, 1e-9)
+    print(f"Inferred {count} families of {len(groups)} shapes "
+          f"in {elapsed:.2f} seconds ({count / elapsed:.1f} families/s).",
+          file=sys.stderr)
+
+
+def family_files(path):
+    """
+    Returns the family CSV files in a directory, in sorted order,
+    or listed in a manifest file, relative to the manifest.
+    """
+    if os.path.isdir(path):
+        return sorted(os.path.join(path, name) for name in os.listdir(path)
+                      if name.endswith(".csv"))
+    directory = os.path.dirname(path)
+    with open(path, encoding="utf-8") as f:
+        return [os.path.join(directory, line.strip()) for line in f
+                if line.strip()]
+
+
+def group_families(filenames):
+    """
+    Returns a dictionary mapping each family shape to a list of
+    (filename, names, traits) for the families with that shape,
+    with names and traits in the order of the shape.
+    """
+    groups = dict()
+    for filename in filenames:
+        people = load_data(filename)
+        family = compile_family(people)
+        traits = [people[name]["trait"] for name in family["names"]]
+        groups.setdefault(family_shape(family), []).append(
+            (filename, family["names"], traits)
+        )
+    return groups
+
+
+def run(groups, processes=None):
+    """
+    Infers every family, compiling one plan per shape, and yields the
+    output rows for one family at a time. Families are handed to
+    worker processes in batches sharing a shape and a plan.
+    """
+    batches = []
+    for shape, families in groups.items():
+        plan = compile_plan(shape)
+        for i in range(0, len(families), BATCH_SIZE):
+            batches.append((plan, families[i:i + BATCH_SIZE]))
+
+    if processes == 1:
+        results = map(infer_batch, batches)
+        for batch in results:
+            yield from batch
+        return
+    with Pool(processes) as pool:
+        for batch in pool.imap_unordered(infer_batch, batches):
+            yield from batch
+
+
+def infer_batch(batch):
+    """
+    Runs a plan for each family in a batch, returning a list of the
+    output rows of each family.
+    """
+    plan, families = batch
+    results = []
+    for filename, names, traits in families:
+        genes = run_plan(plan, traits)
+        rows = []
+        for name, gene, trait in zip(names, genes, traits):
+            distributions = probabilities(gene, trait)
+            rows.append([filename, name, distributions["gene"][2],
+                         distributions["gene"][1], distributions["gene"][0],
+                         distributions["trait"][True]])
+        results.append(rows)
+    return results
+
+
+if __name__ == "__main__":
+    main()
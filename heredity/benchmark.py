@@ -0,0 +1,476 @@
+import argparse
+import itertools
+import time
+
+import numpy as np
+
+from heredity import PROBS, joint_probabilities, joint_probability, load_data
+
+FAMILIES = ["data/family0.csv", "data/family1.csv", "data/family2.csv"]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare joint probability implementations."
+    )
+    parser.add_argument("families", nargs="*", default=FAMILIES,
+                        help="family CSV files (default: data/family*.csv)")
+    args = parser.parse_args()
+
+    print(f"{'family':<24}{'assignments':>12}{'legacy s':>10}"
+          f"{'tables s':>10}{'numpy s':>10}{'legacy wrong':>14}")
+    for filename in args.families:
+        people = load_data(filename)
+        result = compare(people)
+        print(f"{filename:<24}{result['assignments']:>12}"
+              f"{result['legacy']:>10.3f}{result['tables']:>10.3f}"
+              f"{result['numpy']:>10.3f}{result['legacy_wrong']:>14}")
+
+
+def compare(people):
+    """
+    Evaluate the joint probability of every assignment of genes and
+    traits to `people` with each implementation, returning the time
+    each took and how many legacy results disagree with the tables.
+    """
+    names = list(people)
+    genes = np.array(list(itertools.product(range(3), repeat=len(names))))
+    traits = np.array(list(itertools.product([False, True],
+                                             repeat=len(names))))
+    genes = np.repeat(genes, len(traits), axis=0)
+    traits = np.tile(traits, (len(genes) // len(traits), 1))
+
+    assignments = [
+        ({name for name, g in zip(names, row) if g == 1},
+         {name for name, g in zip(names, row) if g == 2},
+         {name for name, t in zip(names, have) if t})
+        for row, have in zip(genes.tolist(), traits.tolist())
+    ]
+
+    start = time.perf_counter()
+    legacy = [legacy_joint_probability(people, *sets) for sets in assignments]
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tables = [joint_probability(people, *sets) for sets in assignments]
+    tables_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectorized = joint_probabilities(people, genes, traits)
+    numpy_seconds = time.perf_counter() - start
+
+    if not np.allclose(tables, vectorized, rtol=1e-12, atol=0):
+        raise AssertionError("Table and NumPy joint probabilities disagree")
+
+    return {
+        "assignments": len(assignments),
+        "legacy": legacy_seconds,
+        "tables": tables_seconds,
+        "numpy": numpy_seconds,
+        "legacy_wrong": int(np.sum(~np.isclose(legacy, tables,
+                                               rtol=1e-12, atol=0)))
+    }
+
+
+def legacy_joint_probability(people, one_gene, two_genes, have_trait):
+    """
+    The original branch-by-branch joint_probability, kept to compare
+    against. Some branches use the wrong trait probability.
+
+    The probability returned should be the probability that
+        * everyone in set `one_gene` has one copy of the gene, and
+        * everyone in set `two_genes` has two copies of the gene, and
+        * everyone not in `one_gene` or `two_gene` does not have the gene, and
+        * everyone in set `have_trait` has the trait, and
+        * everyone not in set` have_trait` does not have the trait.
+    """
+
+    # default orginal joint_probability = 1
+    probability = 1
+
+    # calculate every person's probability in people dictionary
+    for person in people:
+
+        # check how many copies of the gene this person has, and how many copies of the gene this person's parents have
+        if person in one_gene:
+
+            # check if this person has monther and father
+            if people[person]['mother'] and people[person]['father']:
+
+                if people[person]['mother'] in one_gene:
+
+                    # mother is one_gene, and father is one_gene
+                    if people[person]['father'] in one_gene:
+
+                        if person in have_trait:
+                            probability = probability * 2 * (0.5 * PROBS["mutation"] * 0.5 * (1-PROBS["mutation"]) +
+                                             0.5 * PROBS["mutation"] * 0.5 * PROBS["mutation"] +
+                                             0.5 * (1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"]) +
+                                             0.5 * (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"] ) * PROBS["trait"][1][True]
+                            continue
+                        else:
+                            probability = probability * 2 * (0.5 * PROBS["mutation"] * 0.5 * (1-PROBS["mutation"]) +
+                                             0.5 * PROBS["mutation"] * 0.5 * PROBS["mutation"] +
+                                             0.5 * (1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"]) +
+                                             0.5 * (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"] ) * PROBS["trait"][1][False]
+                            continue
+
+                    # mother is one_gene, and father is two_genes
+                    elif people[person]['father'] in two_genes:
+                        if person in have_trait:
+                            probability = probability * (PROBS["mutation"] * 0.5 * PROBS["mutation"] +
+                                                     PROBS["mutation"] * 0.5 * (1-PROBS["mutation"]) +
+                                                     (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"] +
+                                                     (1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"])) * PROBS["trait"][1][True]
+                            continue
+                        else:
+                            probability = probability * (PROBS["mutation"] * 0.5 * PROBS["mutation"] +
+                                                     PROBS["mutation"] * 0.5 * (1-PROBS["mutation"]) +
+                                                     (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"] +
+                                                     (1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"])) * PROBS["trait"][1][False]
+                            continue
+
+                    # mother is one_gene, and father is no_gene
+                    else:
+                        if person in have_trait:
+                            probability = probability * ((1-PROBS["mutation"]) * 0.5 * PROBS["mutation"] +
+                                                     (1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"]) +
+                                                     PROBS["mutation"] * 0.5 * PROBS["mutation"] +
+                                                     PROBS["mutation"] * 0.5 * (1-PROBS["mutation"])) * PROBS["trait"][1][True]
+                            continue
+                        else:
+                            probability = probability * ((1-PROBS["mutation"]) * 0.5 * PROBS["mutation"] +
+                                                     (1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"]) +
+                                                     PROBS["mutation"] * 0.5 * PROBS["mutation"] +
+                                                     PROBS["mutation"] * 0.5 * (1-PROBS["mutation"])) * PROBS["trait"][1][False]
+                            continue
+
+
+                elif people[person]['mother'] in two_genes:
+
+                    # mother is two_genes, and father is one_gene
+                    if people[person]['father'] in one_gene:
+                        if person in have_trait:
+                            probability = probability * (PROBS["mutation"] * 0.5 * PROBS["mutation"] +
+                                                     PROBS["mutation"] * 0.5 * (1-PROBS["mutation"]) +
+                                                     (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"] +
+                                                     (1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"])) * PROBS["trait"][1][True]
+                            continue
+                        else:
+                            probability = probability * (PROBS["mutation"] * 0.5 * PROBS["mutation"] +
+                                                     PROBS["mutation"] * 0.5 * (1-PROBS["mutation"]) +
+                                                     (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"] +
+                                                     (1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"])) * PROBS["trait"][1][False]
+                            continue
+
+                    # mother is two_genes, and father is two_genes
+                    elif people[person]['father'] in two_genes:
+                        if person in have_trait:
+                            probability = probability * (PROBS["mutation"] * (1-PROBS["mutation"]) +
+                                                     (1-PROBS["mutation"]) * PROBS["mutation"]) * PROBS["trait"][1][True]
+                            continue
+                        else:
+                            probability = probability * (PROBS["mutation"] * (1-PROBS["mutation"]) +
+                                                     (1-PROBS["mutation"]) * PROBS["mutation"]) * PROBS["trait"][1][False]
+                            continue
+
+                    # mother is two_genes, and father is no_gene
+                    else:
+                        if person in have_trait:
+                            probability = probability * (PROBS["mutation"] * PROBS["mutation"] +
+                                                     (1-PROBS["mutation"]) * (1-PROBS["mutation"])) * PROBS["trait"][1][True]
+                            continue
+                        else:
+                            probability = probability * (PROBS["mutation"] * PROBS["mutation"] +
+                                                     (1-PROBS["mutation"]) * (1-PROBS["mutation"])) * PROBS["trait"][1][False]
+                            continue
+
+                else:
+                    # mother is no_gene, and father is one_gene
+                    if people[person]['father'] in one_gene:
+                        if person in have_trait:
+                            probability = probability * ((1-PROBS["mutation"]) * 0.5 * PROBS["mutation"] +
+                                                     (1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"]) +
+                                                     PROBS["mutation"] * 0.5 * PROBS["mutation"] +
+                                                     PROBS["mutation"] * 0.5 * (1-PROBS["mutation"])) * PROBS["trait"][1][True]
+                            continue
+                        else:
+                            probability = probability * ((1-PROBS["mutation"]) * 0.5 * PROBS["mutation"] +
+                                                     (1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"]) +
+                                                     PROBS["mutation"] * 0.5 * PROBS["mutation"] +
+                                                     PROBS["mutation"] * 0.5 * (1-PROBS["mutation"])) * PROBS["trait"][1][False]
+                            continue
+
+                    # mother is no_gene, and father is two_genes
+                    elif people[person]['father'] in two_genes:
+                        if person in have_trait:
+                            probability = probability * (PROBS["mutation"] * PROBS["mutation"] +
+                                                     (1-PROBS["mutation"]) * (1-PROBS["mutation"])) * PROBS["trait"][1][True]
+                            continue
+                        else:
+                            probability = probability * (PROBS["mutation"] * PROBS["mutation"] +
+                                                     (1-PROBS["mutation"]) * (1-PROBS["mutation"])) * PROBS["trait"][1][False]
+                            continue
+
+                    # mother is no_gene, and father is no_gene
+                    else:
+                        if person in have_trait:
+                            probability = probability * (PROBS["mutation"] * (1-PROBS["mutation"]) +
+                                                     (1-PROBS["mutation"]) * PROBS["mutation"]) * PROBS["trait"][1][True]
+                            continue
+                        else:
+                            probability = probability * (PROBS["mutation"] * (1-PROBS["mutation"]) +
+                                                     (1-PROBS["mutation"]) * PROBS["mutation"]) * PROBS["trait"][1][True]
+                            continue
+
+            # if this person has no parents
+            else:
+                if person in have_trait:
+                    probability = probability * PROBS["gene"][1] * PROBS["trait"][1][True]
+
+                    continue
+                else:
+                    probability = probability * PROBS["gene"][1] * PROBS["trait"][1][False]
+
+                    continue
+
+        elif person in two_genes:
+
+            # check if this person has monther and father
+            if people[person]['mother'] and people[person]['father']:
+
+                if people[person]['mother'] in one_gene:
+
+                    # mother is one_gene, and father is one_gene
+                    if people[person]['father'] in one_gene:
+
+                        if person in have_trait:
+                            probability = probability * (0.5 * PROBS["mutation"] * 0.5 * PROBS["mutation"] +
+                                             0.5 * PROBS["mutation"] * 0.5 * (1-PROBS["mutation"]) +
+                                             0.5 * (1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"]) +
+                                             0.5 * (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"] ) * PROBS["trait"][2][True]
+                            continue
+                        else:
+                            probability = probability * (0.5 * PROBS["mutation"] * 0.5 * PROBS["mutation"] +
+                                             0.5 * PROBS["mutation"] * 0.5 * (1-PROBS["mutation"]) +
+                                             0.5 * (1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"]) +
+                                             0.5 * (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"] ) * PROBS["trait"][2][False]
+                            continue
+
+                    # mother is one_gene, and father is two_genes
+                    elif people[person]['father'] in two_genes:
+                        if person in have_trait:
+                            probability = probability * ((1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"]) +
+                                                     (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"]) * PROBS["trait"][2][True]
+                            continue
+                        else:
+                            probability = probability * ((1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"]) +
+                                                     (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"]) * PROBS["trait"][2][False]
+                            continue
+
+                    # mother is one_gene, and father is no_gene
+                    else:
+                        if person in have_trait:
+                            probability = probability * (PROBS["mutation"] * 0.5 * PROBS["mutation"] +
+                                                     PROBS["mutation"] * 0.5 * (1-PROBS["mutation"])) * PROBS["trait"][2][True]
+                            continue
+                        else:
+                            probability = probability * (PROBS["mutation"] * 0.5 * PROBS["mutation"] +
+                                                     PROBS["mutation"] * 0.5 * (1-PROBS["mutation"])) * PROBS["trait"][2][False]
+                            continue
+
+
+                elif people[person]['mother'] in two_genes:
+
+                    # mother is two_genes, and father is one_gene
+                    if people[person]['father'] in one_gene:
+                        if person in have_trait:
+                                probability = probability * ((1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"]) +
+                                                        (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"]) * PROBS["trait"][2][True]
+                                continue
+                        else:
+                                probability = probability * ((1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"]) +
+                                                        (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"]) * PROBS["trait"][2][False]
+                                continue
+
+                    # mother is two_genes, and father is two_genes
+                    elif people[person]['father'] in two_genes:
+                        if person in have_trait:
+                            probability = probability * ((1-PROBS["mutation"]) * (1-PROBS["mutation"])) * PROBS["trait"][2][True]
+                            continue
+                        else:
+                            probability = probability * ((1-PROBS["mutation"]) * (1-PROBS["mutation"])) * PROBS["trait"][2][False]
+                            continue
+
+                    # mother is two_genes, and father is no_gene
+                    else:
+                        if person in have_trait:
+                            probability = probability * (PROBS["mutation"] * (1-PROBS["mutation"])) * PROBS["trait"][2][True]
+                            continue
+                        else:
+                            probability = probability * (PROBS["mutation"] * (1-PROBS["mutation"])) * PROBS["trait"][2][False]
+                            continue
+
+                else:
+                    # mother is no_gene, and father is one_gene
+                    if people[person]['father'] in one_gene:
+                        if person in have_trait:
+                            probability = probability * (PROBS["mutation"] * 0.5 * PROBS["mutation"] +
+                                                    PROBS["mutation"] * 0.5 * (1-PROBS["mutation"])) * PROBS["trait"][2][True]
+                            continue
+                        else:
+                            probability = probability * (PROBS["mutation"] * 0.5 * PROBS["mutation"] +
+                                                    PROBS["mutation"] * 0.5 * (1-PROBS["mutation"])) * PROBS["trait"][2][False]
+                            continue
+
+                    # mother is no_gene, and father is two_genes
+                    elif people[person]['father'] in two_genes:
+                        if person in have_trait:
+                            probability = probability * (PROBS["mutation"] * (1-PROBS["mutation"])) * PROBS["trait"][2][True]
+                            continue
+                        else:
+                            probability = probability * (PROBS["mutation"] * (1-PROBS["mutation"])) * PROBS["trait"][2][False]
+                            continue
+
+                    # mother is no_gene, and father is no_gene
+                    else:
+                        if person in have_trait:
+                            probability = probability * (PROBS["mutation"] * PROBS["mutation"]) * PROBS["trait"][2][True]
+                            continue
+                        else:
+                            probability = probability * (PROBS["mutation"] * PROBS["mutation"]) * PROBS["trait"][2][True]
+                            continue
+
+            # if this person has no parents
+            else:
+                if person in have_trait:
+                    probability = probability * PROBS["gene"][2] * PROBS["trait"][2][True]
+
+                    continue
+                else:
+                    probability = probability * PROBS["gene"][2] * PROBS["trait"][2][False]
+
+                    continue
+
+        # this person has no gene
+        else:
+            # check if this person has monther and father
+            if people[person]['mother'] and people[person]['father']:
+
+                if people[person]['mother'] in one_gene:
+
+                    # mother is one_gene, and father is one_gene
+                    if people[person]['father'] in one_gene:
+
+                        if person in have_trait:
+                            probability = probability * (0.5 * PROBS["mutation"] * 0.5 * (1-PROBS["mutation"]) +
+                                             0.5 * PROBS["mutation"] * 0.5 * PROBS["mutation"] +
+                                             0.5 * (1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"]) +
+                                             0.5 * (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"] ) * PROBS["trait"][0][True]
+                            continue
+                        else:
+                            probability = probability * (0.5 * PROBS["mutation"] * 0.5 * (1-PROBS["mutation"]) +
+                                             0.5 * PROBS["mutation"] * 0.5 * PROBS["mutation"] +
+                                             0.5 * (1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"]) +
+                                             0.5 * (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"] ) * PROBS["trait"][0][False]
+                            continue
+
+                    # mother is one_gene, and father is two_genes
+                    elif people[person]['father'] in two_genes:
+                        if person in have_trait:
+                            probability = probability * (PROBS["mutation"] * 0.5 * PROBS["mutation"] +
+                                                     PROBS["mutation"] * 0.5 * (1-PROBS["mutation"])) * PROBS["trait"][0][True]
+                            continue
+                        else:
+                            probability = probability * (PROBS["mutation"] * 0.5 * PROBS["mutation"] +
+                                                     PROBS["mutation"] * 0.5 * (1-PROBS["mutation"])) * PROBS["trait"][0][False]
+                            continue
+
+                    # mother is one_gene, and father is no_gene
+                    else:
+                        if person in have_trait:
+                            probability = probability * ((1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"]) +
+                                                     (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"]) * PROBS["trait"][0][True]
+                            continue
+                        else:
+                            probability = probability * ((1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"]) +
+                                                     (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"]) * PROBS["trait"][0][False]
+                            continue
+
+
+                elif people[person]['mother'] in two_genes:
+
+                    # mother is two_genes, and father is one_gene
+                    if people[person]['father'] in one_gene:
+                        if person in have_trait:
+                            probability = probability * (PROBS["mutation"] * 0.5 * PROBS["mutation"] +
+                                                     PROBS["mutation"] * 0.5 * (1-PROBS["mutation"])) * PROBS["trait"][0][True]
+                            continue
+                        else:
+                            probability = probability * (PROBS["mutation"] * 0.5 * PROBS["mutation"] +
+                                                     PROBS["mutation"] * 0.5 * (1-PROBS["mutation"])) * PROBS["trait"][0][False]
+                            continue
+
+                    # mother is two_genes, and father is two_genes
+                    elif people[person]['father'] in two_genes:
+                        if person in have_trait:
+                            probability = probability * (PROBS["mutation"] * PROBS["mutation"]) * PROBS["trait"][0][True]
+                            continue
+                        else:
+                            probability = probability * (PROBS["mutation"] * PROBS["mutation"]) * PROBS["trait"][0][False]
+                            continue
+
+                    # mother is two_genes, and father is no_gene
+                    else:
+                        if person in have_trait:
+                            probability = probability * ((1-PROBS["mutation"]) * PROBS["mutation"]) * PROBS["trait"][0][True]
+                            continue
+                        else:
+                            probability = probability * ((1-PROBS["mutation"]) * PROBS["mutation"]) * PROBS["trait"][0][False]
+                            continue
+
+                else:
+                    # mother is no_gene, and father is one_gene
+                    if people[person]['father'] in one_gene:
+                        if person in have_trait:
+                            probability = probability * ((1-PROBS["mutation"])* 0.5 * (1-PROBS["mutation"]) +
+                                                     (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"]) * PROBS["trait"][0][True]
+                            continue
+                        else:
+                            probability = probability * ((1-PROBS["mutation"])* 0.5 * (1-PROBS["mutation"]) +
+                                                     (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"]) * PROBS["trait"][0][False]
+                            continue
+
+                    # mother is no_gene, and father is two_genes
+                    if people[person]['father'] in two_genes:
+                        if person in have_trait:
+                            probability = probability * ((1-PROBS["mutation"]) * PROBS["mutation"]) * PROBS["trait"][0][True]
+                            continue
+                        else:
+                            probability = probability * ((1-PROBS["mutation"]) * PROBS["mutation"]) * PROBS["trait"][0][False]
+                            continue
+
+                    # mother is no_gene, and father is no_gene
+                    else:
+                        if person in have_trait:
+                            probability = probability * ((1-PROBS["mutation"]) * (1-PROBS["mutation"])) * PROBS["trait"][0][True]
+                            continue
+                        else:
+                            probability = probability * ((1-PROBS["mutation"]) * (1-PROBS["mutation"])) * PROBS["trait"][0][False]
+                            continue
+
+            # if this person has no parents
+            else:
+                if person in have_trait:
+                    probability = probability * PROBS["gene"][0] * PROBS["trait"][0][True]
+
+                    continue
+                else:
+                    probability = probability * PROBS["gene"][0] * PROBS["trait"][0][False]
+
+                    continue
+    return probability
+
+
+if __name__ == "__main__":
+    main()
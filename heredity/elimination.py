@@ -0,0 +1,253 @@
+import heapq
+import itertools
+
+from heredity import GENE, INHERITANCE, TRAIT, compile_family
+
+# Possible number of copies of the gene
+GENES = (0, 1, 2)
+
+
+class Factor():
+    """
+    Non-negative function of some people's number of gene copies,
+    stored as a table from each assignment of `variables` to a value.
+    """
+
+    def __init__(self, variables, table):
+        self.variables = tuple(variables)
+        self.table = table
+
+    @classmethod
+    def unit(cls, variables=()):
+        """Return the factor that is 1 everywhere over `variables`."""
+        return cls(variables, dict.fromkeys(
+            itertools.product(GENES, repeat=len(variables)), 1.0
+        ))
+
+    def multiply(self, other):
+        """Return the product of this factor and `other`."""
+        variables = self.variables + tuple(
+            v for v in other.variables if v not in self.variables
+        )
+        positions = {v: i for i, v in enumerate(variables)}
+        mine = [positions[v] for v in self.variables]
+        theirs = [positions[v] for v in other.variables]
+        table = dict()
+        for assignment in itertools.product(GENES, repeat=len(variables)):
+            a = self.table[tuple(assignment[i] for i in mine)]
+            b = other.table[tuple(assignment[i] for i in theirs)]
+            table[assignment] = a * b
+        return Factor(variables, table)
+
+    def marginal(self, variables):
+        """
+        Return this factor summed over everything but `variables`,
+        normalized to sum to 1.
+        """
+        variables = tuple(variables)
+        positions = [self.variables.index(v) for v in variables]
+        table = {assignment: 0.0
+                 for assignment in itertools.product(GENES,
+                                                     repeat=len(variables))}
+        for assignment, value in self.table.items():
+            table[tuple(assignment[i] for i in positions)] += value
+        total = sum(table.values())
+        if total == 0:
+            raise ValueError("Evidence has zero probability")
+        return Factor(variables, {assignment: value / total
+                                  for assignment, value in table.items()})
+
+
+def product(factors):
+    result = Factor.unit()
+    for factor in factors:
+        result = result.multiply(factor)
+    return result
+
+
+def person_factor(person, parents, trait):
+    """
+    Return the factor for a person's gene given their parents' genes,
+    times the probability of their trait if it is known. People are
+    numbered, and `parents` is a (mother, father) pair of numbers, or
+    None if the person has no parents listed.
+    """
+    likelihood = [1 if trait is None else TRAIT[genes][trait]
+                  for genes in GENES]
+
+    if parents is None:
+        return Factor((person,), {
+            (genes,): GENE[genes] * likelihood[genes] for genes in GENES
+        })
+
+    table = dict()
+    for mother, father, genes in itertools.product(GENES, repeat=3):
+        table[(genes, mother, father)] = (
+            INHERITANCE[mother][father][genes] * likelihood[genes]
+        )
+    return Factor((person,) + parents, table)
+
+
+def elimination_order(scopes):
+    """
+    Return an order in which to eliminate every variable of factors
+    with the given `scopes`, greedily choosing the one with the fewest
+    neighbours in the graph of variables sharing a factor, then
+    connecting its neighbours. For a family tree, this eliminates
+    people from the leaves inward, so no factor involves more than a
+    few people.
+    """
+    neighbours = dict()
+    for scope in scopes:
+        for v in scope:
+            neighbours.setdefault(v, set()).update(scope)
+            neighbours[v].discard(v)
+
+    heap = [(len(adjacent), v) for v, adjacent in neighbours.items()]
+    heapq.heapify(heap)
+    order = []
+    while heap:
+        degree, v = heapq.heappop(heap)
+        if v not in neighbours or degree != len(neighbours[v]):
+            # Stale entry for an eliminated variable or an old degree
+            continue
+        adjacent = neighbours.pop(v)
+        for u in adjacent:
+            neighbours[u].discard(v)
+            neighbours[u].update(adjacent - {u})
+            heapq.heappush(heap, (len(neighbours[u]), u))
+        order.append(v)
+    return order
+
+
+def family_shape(family):
+    """
+    Return the structure of a family compiled by heredity's
+    compile_family, as a (mother, father) pair of numbers for each
+    person, or None for people with no parents listed. Families with
+    the same shape differ only in names and known traits.
+    """
+    return tuple(None if mother < 0 else (mother, father)
+                 for mother, father in zip(family["mother"].tolist(),
+                                           family["father"].tolist()))
+
+
+def compile_plan(shape):
+    """
+    Return a plan for inference on any family of the given shape.
+
+    Eliminating variables one at a time builds a tree of cliques: each
+    clique eliminates one person's gene, combining the factors of the
+    people whose factor mentions it first with the messages of the
+    cliques that eliminated earlier variables of those factors. The
+    plan records each clique's scope, its people, its child cliques
+    and the separator its message to its parent ranges over.
+    """
+    scopes = [(person,) if parents is None else (person,) + parents
+              for person, parents in enumerate(shape)]
+
+    cliques = []
+    pending = dict()
+    mentions = dict()
+    for key, scope in enumerate(scopes):
+        pending[key] = (scope, None)
+        for v in scope:
+            mentions.setdefault(v, set()).add(key)
+    for variable in elimination_order(scopes):
+        # Keys of factors already combined into a clique are skipped
+        involved = [(key, pending.pop(key))
+                    for key in sorted(mentions.pop(variable))
+                    if key in pending]
+        scope = tuple(sorted({v for _, (scope, _) in involved
+                              for v in scope}))
+        clique = {
+            "variable": variable,
+            "scope": scope,
+            "people": [key for key, (_, source) in involved
+                       if source is None],
+            "children": [source for _, (_, source) in involved
+                         if source is not None],
+            "separator": tuple(v for v in scope if v != variable)
+        }
+        cliques.append(clique)
+        key = len(scopes) + len(cliques) - 1
+        pending[key] = (clique["separator"], len(cliques) - 1)
+        for v in clique["separator"]:
+            mentions[v].add(key)
+    return {"shape": shape, "cliques": cliques}
+
+
+def run_plan(plan, traits):
+    """
+    Return each person's gene distribution as a list of probabilities
+    of 0, 1 and 2 copies, given a list of each person's trait (None if
+    unknown), by passing messages up the plan's clique tree and then
+    back down, so every clique ends with its marginal.
+    """
+    shape = plan["shape"]
+    cliques = plan["cliques"]
+    factors = [person_factor(person, parents, traits[person])
+               for person, parents in enumerate(shape)]
+
+    # Upward pass: each clique's message to its parent, in the order
+    # the cliques were created, so children come first
+    potentials = []
+    up = []
+    for clique in cliques:
+        potential = product([Factor.unit(clique["scope"])] +
+                            [factors[person] for person in clique["people"]])
+        belief = product([potential] +
+                         [up[child] for child in clique["children"]])
+        potentials.append(potential)
+        up.append(belief.marginal(clique["separator"]))
+
+    # Downward pass: reversed creation order visits every parent first
+    down = [Factor.unit()] * len(cliques)
+    genes = [None] * len(shape)
+    for c in reversed(range(len(cliques))):
+        incoming = [potentials[c], down[c]]
+        children = cliques[c]["children"]
+        for child in children:
+            others = [up[other] for other in children if other != child]
+            belief = product(incoming + others)
+            down[child] = belief.marginal(cliques[child]["separator"])
+        belief = product(incoming + [up[child] for child in children])
+        marginal = belief.marginal((cliques[c]["variable"],))
+        genes[cliques[c]["variable"]] = [marginal.table[(count,)]
+                                         for count in GENES]
+    return genes
+
+
+def infer(people):
+    """
+    Compute every person's gene and trait distributions given the
+    known traits, in the same format as heredity's `probabilities`.
+
+    The family is compiled into a Bayesian network of one factor per
+    person, and into a plan of cliques built by variable elimination.
+    Running the plan passes messages towards the root of the clique
+    tree and back, so each person's distribution costs one more local
+    computation instead of another elimination.
+    """
+    family = compile_family(people)
+    traits = [people[name]["trait"] for name in family["names"]]
+    genes = run_plan(compile_plan(family_shape(family)), traits)
+    index = {name: i for i, name in enumerate(family["names"])}
+    return {name: probabilities(genes[index[name]], people[name]["trait"])
+            for name in people}
+
+
+def probabilities(gene, trait):
+    """
+    Return a person's gene and trait distributions in the format of
+    heredity's `probabilities`, given their gene distribution and
+    their trait if known.
+    """
+    if trait is None:
+        true = sum(gene[count] * TRAIT[count][True] for count in GENES)
+    else:
+        true = float(trait)
+    return {
+        "gene": {2: gene[2], 1: gene[1], 0: gene[0]},
+        "trait": {True: true, False: 1 - true}
+    }
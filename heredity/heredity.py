@@ -1,6 +1,11 @@
+import argparse
 import csv
+import functools
 import itertools
-import sys
+import os
+from multiprocessing import Pool
+
+import numpy as np
 
 PROBS = {
 
@@ -37,15 +42,291 @@ PROBS = {
 }
 
 
+def inheritance_table(probs):
+    """
+    Return a table whose [mother][father][child] entry is the
+    probability that a child has `child` copies of the gene given
+    their parents' number of copies.
+    """
+    mutation = probs["mutation"]
+
+    # Probability that a parent with this many copies passes one on
+    passes = [mutation, 0.5, 1 - mutation]
+
+    table = []
+    for m in passes:
+        row = []
+        for f in passes:
+            row.append((
+                (1 - m) * (1 - f),
+                m * (1 - f) + (1 - m) * f,
+                m * f
+            ))
+        table.append(tuple(row))
+    return tuple(table)
+
+
+# Lookup tables built once from PROBS, indexed by number of copies
+# of the gene: GENE[genes], INHERITANCE[mother][father][child], and
+# TRAIT[genes][has trait]
+GENE = tuple(PROBS["gene"][genes] for genes in range(3))
+INHERITANCE = inheritance_table(PROBS)
+TRAIT = tuple((PROBS["trait"][genes][False], PROBS["trait"][genes][True])
+              for genes in range(3))
+GENE_ARRAY = np.array(GENE)
+INHERITANCE_ARRAY = np.array(INHERITANCE)
+TRAIT_ARRAY = np.array(TRAIT)
+
+# The same tables in log space, for products that would underflow
+LOG_GENE = np.log(GENE_ARRAY)
+LOG_INHERITANCE = np.log(INHERITANCE_ARRAY)
+LOG_TRAIT = np.log(TRAIT_ARRAY)
+
+# Gene assignments evaluated at a time by parallel enumeration
+CHUNK_SIZE = 1 << 16
+
+# Inference engines selectable with --engine
+ENGINES = ["enumerate", "elimination", "parallel", "powerset"]
+
+
 def main():
+    parser = argparse.ArgumentParser(
+        description="Infer gene and trait probabilities in a family."
+    )
+    parser.add_argument("data", help="CSV file of the family")
+    parser.add_argument("--engine", choices=ENGINES, default="enumerate",
+                        help="inference engine to use (default: enumerate)")
+    args = parser.parse_args()
+    people = load_data(args.data)
+
+    if args.engine == "elimination":
+        # Imported here, since the engine itself builds on this module
+        from elimination import infer
+        probabilities = infer(people)
+    elif args.engine == "parallel":
+        probabilities = parallel_probabilities(people)
+    elif args.engine == "powerset":
+        probabilities = powerset_probabilities(people)
+    else:
+        probabilities = enumerate_probabilities(people)
 
-    # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
-    people = load_data(sys.argv[1])
+    # Print results
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                print(f"    {value}: {p:.4f}")
 
-    # Keep track of gene and trait probabilities for each person
-    probabilities = {
+
+def enumerate_probabilities(people):
+    """
+    Compute every person's gene and trait distributions by summing the
+    joint probability of every assignment of genes.
+
+    Known traits are fixed rather than enumerated, and unknown traits
+    are summed out for each gene assignment, so only the 3^n gene
+    assignments are visited. They are visited depth-first with parents
+    before children, so each partial product is shared by every
+    assignment that extends it.
+    """
+    probabilities = empty_probabilities(people)
+    order = parents_first(people)
+    genes = dict()
+
+    def visit(i, probability):
+        if i == len(order):
+            for person in order:
+                count = genes[person]
+                probabilities[person]["gene"][count] += probability
+                trait = people[person]["trait"]
+                if trait is None:
+                    for value in (True, False):
+                        probabilities[person]["trait"][value] += (
+                            probability * TRAIT[count][value]
+                        )
+                else:
+                    probabilities[person]["trait"][trait] += probability
+            return
+
+        person = order[i]
+        data = people[person]
+        for count in range(3):
+            p = probability * person_factor(count, genes.get(data["mother"]),
+                                            genes.get(data["father"]),
+                                            data["trait"])
+            if p == 0:
+                continue
+            genes[person] = count
+            visit(i + 1, p)
+        genes.pop(person, None)
+
+    visit(0, 1)
+    normalize(probabilities)
+    return probabilities
+
+
+@functools.lru_cache(maxsize=None)
+def person_factor(genes, mother, father, trait):
+    """
+    Return the probability that a person has `genes` copies of the
+    gene, given their parents' copies (None if the person has no
+    parents listed), times the probability of their trait if known.
+    """
+    if mother is None:
+        probability = GENE[genes]
+    else:
+        probability = INHERITANCE[mother][father][genes]
+    if trait is not None:
+        probability *= TRAIT[genes][trait]
+    return probability
+
+
+def parents_first(people):
+    """
+    Return the names in `people` ordered so that everyone comes after
+    their mother and father.
+    """
+    order = []
+    placed = set()
+    for person in people:
+        stack = [person]
+        while stack:
+            name = stack[-1]
+            if name in placed:
+                stack.pop()
+                continue
+            parents = [parent for parent in (people[name]["mother"],
+                                             people[name]["father"])
+                       if parent is not None and parent not in placed]
+            if parents:
+                stack.extend(parents)
+            else:
+                stack.pop()
+                placed.add(name)
+                order.append(name)
+    return order
+
+
+def compile_family(people):
+    """
+    Return the family as arrays indexed by position in a parents-first
+    order: each person's mother and father (-1 if not listed), and
+    their trait (-1 if unknown, otherwise 0 or 1).
+    """
+    names = parents_first(people)
+    index = {name: i for i, name in enumerate(names)}
+    mother = np.array([index.get(people[name]["mother"], -1)
+                       for name in names])
+    father = np.array([index.get(people[name]["father"], -1)
+                       for name in names])
+    trait = np.array([-1 if people[name]["trait"] is None
+                      else int(people[name]["trait"]) for name in names])
+
+    # For Gibbs sampling: each child with the column of the other parent,
+    # and whether this person is the child's mother
+    children = [[] for _ in names]
+    for child in range(len(names)):
+        if mother[child] >= 0:
+            children[mother[child]].append((child, father[child], True))
+            children[father[child]].append((child, mother[child], False))
+    return {"names": names, "mother": mother, "father": father,
+            "trait": trait, "children": children}
+
+
+def parallel_probabilities(people, processes=None):
+    """
+    Compute every person's gene and trait distributions by enumerating
+    every assignment of genes in log space, like enumerate_probabilities.
+
+    Assignments are split by the genes of the first few people in
+    parents-first order, each prefix is enumerated in chunks by a
+    worker process, and the workers' partial sums are merged.
+    """
+    family = compile_family(people)
+    n = len(family["names"])
+    workers = processes or os.cpu_count() or 1
+
+    # Enough prefixes to keep every worker busy
+    prefix = 0
+    while prefix < n and 3 ** prefix < 4 * workers:
+        prefix += 1
+    tasks = [(family, prefix, index) for index in range(3 ** prefix)]
+
+    total = LogAccumulator(family["names"])
+    if workers == 1:
+        for partial in map(enumerate_prefix, tasks):
+            total.merge(partial)
+    else:
+        with Pool(workers) as pool:
+            for partial in pool.imap_unordered(enumerate_prefix, tasks):
+                total.merge(partial)
+
+    probabilities = total.probabilities()
+    return {person: probabilities[person] for person in people}
+
+
+def enumerate_prefix(task):
+    """
+    Return a LogAccumulator of every gene assignment in which the first
+    `prefix` people in the family have the genes given by the digits
+    of `index` in base 3.
+    """
+    family, prefix, index = task
+    n = len(family["names"])
+    rest = n - prefix
+    accumulator = LogAccumulator(family["names"])
+    start_genes = base3_digits(np.array([index]), prefix)
+    for start in range(0, 3 ** rest, CHUNK_SIZE):
+        rows = np.arange(start, min(start + CHUNK_SIZE, 3 ** rest))
+        genes = np.empty((len(rows), n), dtype=np.intp)
+        genes[:, :prefix] = start_genes
+        genes[:, prefix:] = base3_digits(rows, rest)
+        accumulator.add(genes, *log_joint_probabilities(family, genes))
+    return accumulator
+
+
+def base3_digits(numbers, width):
+    """
+    Return an array with the `width` base 3 digits of each of
+    `numbers`, most significant first.
+    """
+    powers = 3 ** np.arange(width - 1, -1, -1)
+    return (numbers[:, np.newaxis] // powers) % 3
+
+
+def log_joint_probabilities(family, genes):
+    """
+    Given a compiled family and a (rows, people) array of gene
+    assignments, return the log joint probability of each row with the
+    known traits, and a (rows, people, 2) array of the log probability
+    of each person not having and having the trait given the row.
+    """
+    log_p = np.zeros(len(genes))
+    log_traits = np.empty(genes.shape + (2,))
+    for i in range(genes.shape[1]):
+        mother, father, trait = (family["mother"][i], family["father"][i],
+                                 family["trait"][i])
+        if mother < 0:
+            log_p += LOG_GENE[genes[:, i]]
+        else:
+            log_p += LOG_INHERITANCE[genes[:, mother], genes[:, father],
+                                     genes[:, i]]
+        if trait < 0:
+            log_traits[:, i] = LOG_TRAIT[genes[:, i]]
+        else:
+            log_p += LOG_TRAIT[genes[:, i], trait]
+            log_traits[:, i] = -np.inf
+            log_traits[:, i, trait] = 0
+    return log_p, log_traits
+
+
+def empty_probabilities(people):
+    """
+    Return gene and trait distributions of all zeros for each person.
+    """
+    return {
         person: {
             "gene": {
                 2: 0,
@@ -60,6 +341,16 @@ def main():
         for person in people
     }
 
+
+def powerset_probabilities(people):
+    """
+    Compute every person's gene and trait distributions by summing the
+    joint probability of every assignment of genes and traits.
+    """
+
+    # Keep track of gene and trait probabilities for each person
+    probabilities = empty_probabilities(people)
+
     # Loop over all sets of people who might have the trait
     names = set(people)
     for have_trait in powerset(names):
@@ -83,15 +374,7 @@ def main():
 
     # Ensure probabilities sum to 1
     normalize(probabilities)
-
-    # Print results
-    for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+    return probabilities
 
 
 def load_data(filename):
@@ -139,393 +422,47 @@ def joint_probability(people, one_gene, two_genes, have_trait):
         * everyone in set `have_trait` has the trait, and
         * everyone not in set` have_trait` does not have the trait.
     """
+    genes = dict.fromkeys(people, 0)
+    genes.update(dict.fromkeys(one_gene, 1))
+    genes.update(dict.fromkeys(two_genes, 2))
 
-    # default orginal joint_probability = 1
     probability = 1
-
-    # calculate every person's probability in people dictionary
-    for person in people:
-
-        # check how many copies of the gene this person has, and how many copies of the gene this person's parents have
-        if person in one_gene:
-
-            # check if this person has monther and father
-            if people[person]['mother'] and people[person]['father']:
-
-                if people[person]['mother'] in one_gene:
-
-                    # mother is one_gene, and father is one_gene
-                    if people[person]['father'] in one_gene:
-
-                        if person in have_trait:
-                            probability = probability * 2 * (0.5 * PROBS["mutation"] * 0.5 * (1-PROBS["mutation"]) +
-                                             0.5 * PROBS["mutation"] * 0.5 * PROBS["mutation"] +
-                                             0.5 * (1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"]) +
-                                             0.5 * (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"] ) * PROBS["trait"][1][True]
-                            continue
-                        else:
-                            probability = probability * 2 * (0.5 * PROBS["mutation"] * 0.5 * (1-PROBS["mutation"]) +
-                                             0.5 * PROBS["mutation"] * 0.5 * PROBS["mutation"] +
-                                             0.5 * (1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"]) +
-                                             0.5 * (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"] ) * PROBS["trait"][1][False]
-                            continue
-
-                    # mother is one_gene, and father is two_genes
-                    elif people[person]['father'] in two_genes:
-                        if person in have_trait:
-                            probability = probability * (PROBS["mutation"] * 0.5 * PROBS["mutation"] +
-                                                     PROBS["mutation"] * 0.5 * (1-PROBS["mutation"]) +
-                                                     (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"] +
-                                                     (1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"])) * PROBS["trait"][1][True]
-                            continue
-                        else:
-                            probability = probability * (PROBS["mutation"] * 0.5 * PROBS["mutation"] +
-                                                     PROBS["mutation"] * 0.5 * (1-PROBS["mutation"]) +
-                                                     (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"] +
-                                                     (1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"])) * PROBS["trait"][1][False]
-                            continue
-
-                    # mother is one_gene, and father is no_gene
-                    else:
-                        if person in have_trait:
-                            probability = probability * ((1-PROBS["mutation"]) * 0.5 * PROBS["mutation"] +
-                                                     (1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"]) +
-                                                     PROBS["mutation"] * 0.5 * PROBS["mutation"] +
-                                                     PROBS["mutation"] * 0.5 * (1-PROBS["mutation"])) * PROBS["trait"][1][True]
-                            continue
-                        else:
-                            probability = probability * ((1-PROBS["mutation"]) * 0.5 * PROBS["mutation"] +
-                                                     (1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"]) +
-                                                     PROBS["mutation"] * 0.5 * PROBS["mutation"] +
-                                                     PROBS["mutation"] * 0.5 * (1-PROBS["mutation"])) * PROBS["trait"][1][False]
-                            continue
-
-
-                elif people[person]['mother'] in two_genes:
-
-                    # mother is two_genes, and father is one_gene
-                    if people[person]['father'] in one_gene:
-                        if person in have_trait:
-                            probability = probability * (PROBS["mutation"] * 0.5 * PROBS["mutation"] +
-                                                     PROBS["mutation"] * 0.5 * (1-PROBS["mutation"]) +
-                                                     (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"] +
-                                                     (1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"])) * PROBS["trait"][1][True]
-                            continue
-                        else:
-                            probability = probability * (PROBS["mutation"] * 0.5 * PROBS["mutation"] +
-                                                     PROBS["mutation"] * 0.5 * (1-PROBS["mutation"]) +
-                                                     (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"] +
-                                                     (1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"])) * PROBS["trait"][1][False]
-                            continue
-
-                    # mother is two_genes, and father is two_genes
-                    elif people[person]['father'] in two_genes:
-                        if person in have_trait:
-                            probability = probability * (PROBS["mutation"] * (1-PROBS["mutation"]) +
-                                                     (1-PROBS["mutation"]) * PROBS["mutation"]) * PROBS["trait"][1][True]
-                            continue
-                        else:
-                            probability = probability * (PROBS["mutation"] * (1-PROBS["mutation"]) +
-                                                     (1-PROBS["mutation"]) * PROBS["mutation"]) * PROBS["trait"][1][False]
-                            continue
-
-                    # mother is two_genes, and father is no_gene
-                    else:
-                        if person in have_trait:
-                            probability = probability * (PROBS["mutation"] * PROBS["mutation"] +
-                                                     (1-PROBS["mutation"]) * (1-PROBS["mutation"])) * PROBS["trait"][1][True]
-                            continue
-                        else:
-                            probability = probability * (PROBS["mutation"] * PROBS["mutation"] +
-                                                     (1-PROBS["mutation"]) * (1-PROBS["mutation"])) * PROBS["trait"][1][False]
-                            continue
-
-                else:
-                    # mother is no_gene, and father is one_gene
-                    if people[person]['father'] in one_gene:
-                        if person in have_trait:
-                            probability = probability * ((1-PROBS["mutation"]) * 0.5 * PROBS["mutation"] +
-                                                     (1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"]) +
-                                                     PROBS["mutation"] * 0.5 * PROBS["mutation"] +
-                                                     PROBS["mutation"] * 0.5 * (1-PROBS["mutation"])) * PROBS["trait"][1][True]
-                            continue
-                        else:
-                            probability = probability * ((1-PROBS["mutation"]) * 0.5 * PROBS["mutation"] +
-                                                     (1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"]) +
-                                                     PROBS["mutation"] * 0.5 * PROBS["mutation"] +
-                                                     PROBS["mutation"] * 0.5 * (1-PROBS["mutation"])) * PROBS["trait"][1][False]
-                            continue
-
-                    # mother is no_gene, and father is two_genes
-                    elif people[person]['father'] in two_genes:
-                        if person in have_trait:
-                            probability = probability * (PROBS["mutation"] * PROBS["mutation"] +
-                                                     (1-PROBS["mutation"]) * (1-PROBS["mutation"])) * PROBS["trait"][1][True]
-                            continue
-                        else:
-                            probability = probability * (PROBS["mutation"] * PROBS["mutation"] +
-                                                     (1-PROBS["mutation"]) * (1-PROBS["mutation"])) * PROBS["trait"][1][False]
-                            continue
-
-                    # mother is no_gene, and father is no_gene
-                    else:
-                        if person in have_trait:
-                            probability = probability * (PROBS["mutation"] * (1-PROBS["mutation"]) +
-                                                     (1-PROBS["mutation"]) * PROBS["mutation"]) * PROBS["trait"][1][True]
-                            continue
-                        else:
-                            probability = probability * (PROBS["mutation"] * (1-PROBS["mutation"]) +
-                                                     (1-PROBS["mutation"]) * PROBS["mutation"]) * PROBS["trait"][1][True]
-                            continue
-
-            # if this person has no parents
-            else:
-                if person in have_trait:
-                    probability = probability * PROBS["gene"][1] * PROBS["trait"][1][True]
-
-                    continue
-                else:
-                    probability = probability * PROBS["gene"][1] * PROBS["trait"][1][False]
-
-                    continue
-
-        elif person in two_genes:
-
-            # check if this person has monther and father
-            if people[person]['mother'] and people[person]['father']:
-
-                if people[person]['mother'] in one_gene:
-
-                    # mother is one_gene, and father is one_gene
-                    if people[person]['father'] in one_gene:
-
-                        if person in have_trait:
-                            probability = probability * (0.5 * PROBS["mutation"] * 0.5 * PROBS["mutation"] +
-                                             0.5 * PROBS["mutation"] * 0.5 * (1-PROBS["mutation"]) +
-                                             0.5 * (1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"]) +
-                                             0.5 * (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"] ) * PROBS["trait"][2][True]
-                            continue
-                        else:
-                            probability = probability * (0.5 * PROBS["mutation"] * 0.5 * PROBS["mutation"] +
-                                             0.5 * PROBS["mutation"] * 0.5 * (1-PROBS["mutation"]) +
-                                             0.5 * (1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"]) +
-                                             0.5 * (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"] ) * PROBS["trait"][2][False]
-                            continue
-
-                    # mother is one_gene, and father is two_genes
-                    elif people[person]['father'] in two_genes:
-                        if person in have_trait:
-                            probability = probability * ((1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"]) +
-                                                     (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"]) * PROBS["trait"][2][True]
-                            continue
-                        else:
-                            probability = probability * ((1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"]) +
-                                                     (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"]) * PROBS["trait"][2][False]
-                            continue
-
-                    # mother is one_gene, and father is no_gene
-                    else:
-                        if person in have_trait:
-                            probability = probability * (PROBS["mutation"] * 0.5 * PROBS["mutation"] +
-                                                     PROBS["mutation"] * 0.5 * (1-PROBS["mutation"])) * PROBS["trait"][2][True]
-                            continue
-                        else:
-                            probability = probability * (PROBS["mutation"] * 0.5 * PROBS["mutation"] +
-                                                     PROBS["mutation"] * 0.5 * (1-PROBS["mutation"])) * PROBS["trait"][2][False]
-                            continue
-
-
-                elif people[person]['mother'] in two_genes:
-
-                    # mother is two_genes, and father is one_gene
-                    if people[person]['father'] in one_gene:
-                        if person in have_trait:
-                                probability = probability * ((1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"]) +
-                                                        (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"]) * PROBS["trait"][2][True]
-                                continue
-                        else:
-                                probability = probability * ((1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"]) +
-                                                        (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"]) * PROBS["trait"][2][False]
-                                continue
-
-                    # mother is two_genes, and father is two_genes
-                    elif people[person]['father'] in two_genes:
-                        if person in have_trait:
-                            probability = probability * ((1-PROBS["mutation"]) * (1-PROBS["mutation"])) * PROBS["trait"][2][True]
-                            continue
-                        else:
-                            probability = probability * ((1-PROBS["mutation"]) * (1-PROBS["mutation"])) * PROBS["trait"][2][False]
-                            continue
-
-                    # mother is two_genes, and father is no_gene
-                    else:
-                        if person in have_trait:
-                            probability = probability * (PROBS["mutation"] * (1-PROBS["mutation"])) * PROBS["trait"][2][True]
-                            continue
-                        else:
-                            probability = probability * (PROBS["mutation"] * (1-PROBS["mutation"])) * PROBS["trait"][2][False]
-                            continue
-
-                else:
-                    # mother is no_gene, and father is one_gene
-                    if people[person]['father'] in one_gene:
-                        if person in have_trait:
-                            probability = probability * (PROBS["mutation"] * 0.5 * PROBS["mutation"] +
-                                                    PROBS["mutation"] * 0.5 * (1-PROBS["mutation"])) * PROBS["trait"][2][True]
-                            continue
-                        else:
-                            probability = probability * (PROBS["mutation"] * 0.5 * PROBS["mutation"] +
-                                                    PROBS["mutation"] * 0.5 * (1-PROBS["mutation"])) * PROBS["trait"][2][False]
-                            continue
-
-                    # mother is no_gene, and father is two_genes
-                    elif people[person]['father'] in two_genes:
-                        if person in have_trait:
-                            probability = probability * (PROBS["mutation"] * (1-PROBS["mutation"])) * PROBS["trait"][2][True]
-                            continue
-                        else:
-                            probability = probability * (PROBS["mutation"] * (1-PROBS["mutation"])) * PROBS["trait"][2][False]
-                            continue
-
-                    # mother is no_gene, and father is no_gene
-                    else:
-                        if person in have_trait:
-                            probability = probability * (PROBS["mutation"] * PROBS["mutation"]) * PROBS["trait"][2][True]
-                            continue
-                        else:
-                            probability = probability * (PROBS["mutation"] * PROBS["mutation"]) * PROBS["trait"][2][True]
-                            continue
-
-            # if this person has no parents
-            else:
-                if person in have_trait:
-                    probability = probability * PROBS["gene"][2] * PROBS["trait"][2][True]
-
-                    continue
-                else:
-                    probability = probability * PROBS["gene"][2] * PROBS["trait"][2][False]
-
-                    continue
-
-        # this person has no gene
+    for person, data in people.items():
+        count = genes[person]
+        mother = data["mother"]
+        if mother is None:
+            probability *= GENE[count]
         else:
-            # check if this person has monther and father
-            if people[person]['mother'] and people[person]['father']:
-
-                if people[person]['mother'] in one_gene:
-
-                    # mother is one_gene, and father is one_gene
-                    if people[person]['father'] in one_gene:
-
-                        if person in have_trait:
-                            probability = probability * (0.5 * PROBS["mutation"] * 0.5 * (1-PROBS["mutation"]) +
-                                             0.5 * PROBS["mutation"] * 0.5 * PROBS["mutation"] +
-                                             0.5 * (1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"]) +
-                                             0.5 * (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"] ) * PROBS["trait"][0][True]
-                            continue
-                        else:
-                            probability = probability * (0.5 * PROBS["mutation"] * 0.5 * (1-PROBS["mutation"]) +
-                                             0.5 * PROBS["mutation"] * 0.5 * PROBS["mutation"] +
-                                             0.5 * (1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"]) +
-                                             0.5 * (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"] ) * PROBS["trait"][0][False]
-                            continue
-
-                    # mother is one_gene, and father is two_genes
-                    elif people[person]['father'] in two_genes:
-                        if person in have_trait:
-                            probability = probability * (PROBS["mutation"] * 0.5 * PROBS["mutation"] +
-                                                     PROBS["mutation"] * 0.5 * (1-PROBS["mutation"])) * PROBS["trait"][0][True]
-                            continue
-                        else:
-                            probability = probability * (PROBS["mutation"] * 0.5 * PROBS["mutation"] +
-                                                     PROBS["mutation"] * 0.5 * (1-PROBS["mutation"])) * PROBS["trait"][0][False]
-                            continue
-
-                    # mother is one_gene, and father is no_gene
-                    else:
-                        if person in have_trait:
-                            probability = probability * ((1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"]) +
-                                                     (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"]) * PROBS["trait"][0][True]
-                            continue
-                        else:
-                            probability = probability * ((1-PROBS["mutation"]) * 0.5 * (1-PROBS["mutation"]) +
-                                                     (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"]) * PROBS["trait"][0][False]
-                            continue
-
-
-                elif people[person]['mother'] in two_genes:
-
-                    # mother is two_genes, and father is one_gene
-                    if people[person]['father'] in one_gene:
-                        if person in have_trait:
-                            probability = probability * (PROBS["mutation"] * 0.5 * PROBS["mutation"] +
-                                                     PROBS["mutation"] * 0.5 * (1-PROBS["mutation"])) * PROBS["trait"][0][True]
-                            continue
-                        else:
-                            probability = probability * (PROBS["mutation"] * 0.5 * PROBS["mutation"] +
-                                                     PROBS["mutation"] * 0.5 * (1-PROBS["mutation"])) * PROBS["trait"][0][False]
-                            continue
-
-                    # mother is two_genes, and father is two_genes
-                    elif people[person]['father'] in two_genes:
-                        if person in have_trait:
-                            probability = probability * (PROBS["mutation"] * PROBS["mutation"]) * PROBS["trait"][0][True]
-                            continue
-                        else:
-                            probability = probability * (PROBS["mutation"] * PROBS["mutation"]) * PROBS["trait"][0][False]
-                            continue
-
-                    # mother is two_genes, and father is no_gene
-                    else:
-                        if person in have_trait:
-                            probability = probability * ((1-PROBS["mutation"]) * PROBS["mutation"]) * PROBS["trait"][0][True]
-                            continue
-                        else:
-                            probability = probability * ((1-PROBS["mutation"]) * PROBS["mutation"]) * PROBS["trait"][0][False]
-                            continue
-
-                else:
-                    # mother is no_gene, and father is one_gene
-                    if people[person]['father'] in one_gene:
-                        if person in have_trait:
-                            probability = probability * ((1-PROBS["mutation"])* 0.5 * (1-PROBS["mutation"]) +
-                                                     (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"]) * PROBS["trait"][0][True]
-                            continue
-                        else:
-                            probability = probability * ((1-PROBS["mutation"])* 0.5 * (1-PROBS["mutation"]) +
-                                                     (1-PROBS["mutation"]) * 0.5 * PROBS["mutation"]) * PROBS["trait"][0][False]
-                            continue
-
-                    # mother is no_gene, and father is two_genes
-                    if people[person]['father'] in two_genes:
-                        if person in have_trait:
-                            probability = probability * ((1-PROBS["mutation"]) * PROBS["mutation"]) * PROBS["trait"][0][True]
-                            continue
-                        else:
-                            probability = probability * ((1-PROBS["mutation"]) * PROBS["mutation"]) * PROBS["trait"][0][False]
-                            continue
-
-                    # mother is no_gene, and father is no_gene
-                    else:
-                        if person in have_trait:
-                            probability = probability * ((1-PROBS["mutation"]) * (1-PROBS["mutation"])) * PROBS["trait"][0][True]
-                            continue
-                        else:
-                            probability = probability * ((1-PROBS["mutation"]) * (1-PROBS["mutation"])) * PROBS["trait"][0][False]
-                            continue
-
-            # if this person has no parents
-            else:
-                if person in have_trait:
-                    probability = probability * PROBS["gene"][0] * PROBS["trait"][0][True]
+            probability *= INHERITANCE[genes[mother]][genes[data["father"]]][count]
+        probability *= TRAIT[count][person in have_trait]
+    return probability
 
-                    continue
-                else:
-                    probability = probability * PROBS["gene"][0] * PROBS["trait"][0][False]
 
-                    continue
-    return probability
+def joint_probabilities(people, genes, traits):
+    """
+    Compute the joint probability of many assignments at once.
 
+    `genes` is an integer array with a row for each assignment and a
+    column for each person, in the order of `people`, giving their
+    number of copies of the gene; `traits` is a boolean array of the
+    same shape. Return an array with the probability of each row.
+    """
+    genes = np.asarray(genes)
+    traits = np.asarray(traits, dtype=np.intp)
+    column = {person: i for i, person in enumerate(people)}
+
+    probabilities = np.ones(len(genes))
+    for i, person in enumerate(people):
+        mother = people[person]["mother"]
+        if mother is None:
+            probabilities *= GENE_ARRAY[genes[:, i]]
+        else:
+            father = people[person]["father"]
+            probabilities *= INHERITANCE_ARRAY[genes[:, column[mother]],
+                                               genes[:, column[father]],
+                                               genes[:, i]]
+        probabilities *= TRAIT_ARRAY[genes[:, i], traits[:, i]]
+    return probabilities
 
 
 def update(probabilities, one_gene, two_genes, have_trait, p):
@@ -594,5 +531,62 @@ def normalize(probabilities):
         probabilities[person]["trait"][True] = d * 1/(d+e)
         probabilities[person]["trait"][False] = e * 1/(d+e)
 
+
+class LogAccumulator():
+    """
+    Sums of joint probabilities for each person's genes and traits, as
+    in `update`, kept as logarithms in flat (people, 3) and (people, 2)
+    arrays so that sums of tiny probabilities cannot underflow.
+    Rows follow the order of `names`.
+    """
+
+    def __init__(self, names):
+        self.names = list(names)
+        self.genes = np.full((len(self.names), 3), -np.inf)
+        self.traits = np.full((len(self.names), 2), -np.inf)
+
+    def add(self, genes, log_p, log_traits):
+        """
+        Add a chunk of assignments: a (rows, people) array of `genes`,
+        the log joint probability of each row, and a (rows, people, 2)
+        array of the log probability of each person not having and
+        having the trait given the row.
+        """
+        top = log_p.max(initial=-np.inf)
+        if top == -np.inf:
+            return
+        weights = np.exp(log_p - top)
+        with np.errstate(divide="ignore"):
+            for copies in range(3):
+                sums = weights @ (genes == copies)
+                self.genes[:, copies] = np.logaddexp(self.genes[:, copies],
+                                                     np.log(sums) + top)
+            sums = np.einsum("r,rpt->pt", weights, np.exp(log_traits))
+            self.traits = np.logaddexp(self.traits, np.log(sums) + top)
+
+    def merge(self, other):
+        """Add the sums accumulated by `other` to these."""
+        self.genes = np.logaddexp(self.genes, other.genes)
+        self.traits = np.logaddexp(self.traits, other.traits)
+
+    def probabilities(self):
+        """
+        Return the normalized distributions in the same format as
+        `probabilities` in main.
+        """
+        genes = np.exp(self.genes - np.logaddexp.reduce(self.genes, axis=1,
+                                                        keepdims=True))
+        traits = np.exp(self.traits - np.logaddexp.reduce(self.traits, axis=1,
+                                                          keepdims=True))
+        return {
+            name: {
+                "gene": {2: gene[2], 1: gene[1], 0: gene[0]},
+                "trait": {True: trait[1], False: trait[0]}
+            }
+            for name, gene, trait in zip(self.names, genes.tolist(),
+                                         traits.tolist())
+        }
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,260 @@
+import argparse
+import os
+from multiprocessing import Pool
+
+import numpy as np
+
+from heredity import (GENE_ARRAY, INHERITANCE_ARRAY, LOG_GENE, LOG_INHERITANCE,
+                      LOG_TRAIT, TRAIT_ARRAY, compile_family, load_data)
+
+# Samples drawn in total, across every chain
+SAMPLES = 100000
+
+# Independent chains, whose estimates give the standard errors
+CHAINS = 16
+
+# Gibbs sweeps discarded at the start of each chain
+BURN_IN = 100
+
+# Weighted samples drawn at a time by likelihood weighting
+CHUNK_SIZE = 10000
+
+METHODS = ["likelihood", "gibbs"]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Estimate gene and trait probabilities by sampling."
+    )
+    parser.add_argument("data", help="CSV file of the family")
+    parser.add_argument("--method", choices=METHODS, default="likelihood",
+                        help="sampling method (default: likelihood)")
+    parser.add_argument("--samples", type=int, default=SAMPLES,
+                        help=f"samples across all chains (default: {SAMPLES})")
+    parser.add_argument("--chains", type=int, default=CHAINS,
+                        help=f"independent chains (default: {CHAINS})")
+    parser.add_argument("--burn-in", type=int, default=BURN_IN,
+                        help=f"Gibbs sweeps to discard (default: {BURN_IN})")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="random seed, for reproducible estimates")
+    args = parser.parse_args()
+
+    people = load_data(args.data)
+    probabilities, errors = sample_probabilities(
+        people, args.method, args.samples, args.chains, args.burn_in,
+        args.processes, args.seed
+    )
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                error = errors[person][field][value]
+                print(f"    {value}: {p:.4f} ± {error:.4f}")
+
+
+def choose(distributions, rng):
+    """
+    Return one sample from each row of `distributions`, an array of
+    probabilities of 0, 1 and 2 copies of the gene.
+    """
+    thresholds = np.cumsum(distributions, axis=1)[:, :2]
+    u = rng.random(len(distributions))[:, np.newaxis]
+    return (u >= thresholds).sum(axis=1)
+
+
+def likelihood_weighting(family, chains, samples, rng):
+    """
+    Return gene and trait estimates from `chains` independent batches
+    of `samples` samples each. Genes are drawn parents first from their
+    conditional distributions, and each sample is weighted by the
+    probability of the known traits given its genes.
+
+    The weights concentrate on fewer samples as more traits are known,
+    so for large families with many known traits Gibbs sampling gives
+    far better estimates for the same budget.
+    """
+    n = len(family["names"])
+    genes = np.zeros((chains, n, 3))
+    traits = np.zeros((chains, n))
+    for chain in range(chains):
+        # Running sums of weights, scaled by exp(-scale) to avoid underflow
+        scale = -np.inf
+        total = 0.0
+        for start in range(0, samples, CHUNK_SIZE):
+            count = min(CHUNK_SIZE, samples - start)
+            sample = np.empty((count, n), dtype=np.intp)
+            log_weights = np.zeros(count)
+            for i in range(n):
+                if family["mother"][i] < 0:
+                    distributions = np.broadcast_to(GENE_ARRAY, (count, 3))
+                else:
+                    distributions = INHERITANCE_ARRAY[
+                        sample[:, family["mother"][i]],
+                        sample[:, family["father"][i]]
+                    ]
+                sample[:, i] = choose(distributions, rng)
+                if family["trait"][i] >= 0:
+                    log_weights += LOG_TRAIT[sample[:, i], family["trait"][i]]
+
+            top = log_weights.max()
+            if top > scale:
+                rescale = np.exp(scale - top)
+                genes[chain] *= rescale
+                traits[chain] *= rescale
+                total *= rescale
+                scale = top
+            weights = np.exp(log_weights - scale)
+            for copies in range(3):
+                genes[chain, :, copies] += weights @ (sample == copies)
+            traits[chain] += weights @ TRAIT_ARRAY[sample, 1]
+            total += weights.sum()
+        genes[chain] /= total
+        traits[chain] /= total
+    return genes, traits
+
+
+def gibbs(family, chains, samples, burn_in, rng):
+    """
+    Return gene and trait estimates from `chains` independent Gibbs
+    chains of `samples` sweeps each after `burn_in` sweeps, run side
+    by side as the rows of one array.
+
+    Each sweep redraws every person's genes given everyone else's,
+    which depends only on their parents, their known trait, and their
+    children with each child's other parent. The estimates average the
+    conditional distribution at every draw rather than the draws.
+    """
+    n = len(family["names"])
+    rows = np.arange(chains)
+    values = np.arange(3)
+
+    # Start from a sample of the prior, ignoring the known traits
+    state = np.empty((chains, n), dtype=np.intp)
+    for i in range(n):
+        if family["mother"][i] < 0:
+            distributions = np.broadcast_to(GENE_ARRAY, (chains, 3))
+        else:
+            distributions = INHERITANCE_ARRAY[state[:, family["mother"][i]],
+                                              state[:, family["father"][i]]]
+        state[:, i] = choose(distributions, rng)
+
+    # Everything a redraw needs, looked up once per person
+    updates = []
+    for i in range(n):
+        mother, father = int(family["mother"][i]), int(family["father"][i])
+        trait = int(family["trait"][i])
+        updates.append((
+            i,
+            None if mother < 0 else (mother, father),
+            None if trait < 0 else LOG_TRAIT[:, trait],
+            [(int(child), int(other), is_mother)
+             for child, other, is_mother in family["children"][i]]
+        ))
+    prior = np.broadcast_to(LOG_GENE, (chains, 3))
+
+    genes = np.zeros((chains, n, 3))
+    for sweep in range(burn_in + samples):
+        keep = sweep >= burn_in
+        for i, parents, likelihood, children in updates:
+            if parents is None:
+                log_p = prior
+            else:
+                log_p = LOG_INHERITANCE[state[:, parents[0]],
+                                        state[:, parents[1]]]
+            if likelihood is not None:
+                log_p = log_p + likelihood
+            for child, other, is_mother in children:
+                other_genes = state[:, other, np.newaxis]
+                child_genes = state[:, child, np.newaxis]
+                if is_mother:
+                    log_p = log_p + LOG_INHERITANCE[values, other_genes,
+                                                    child_genes]
+                else:
+                    log_p = log_p + LOG_INHERITANCE[other_genes, values,
+                                                    child_genes]
+            distributions = np.exp(log_p - log_p.max(axis=1, keepdims=True))
+            distributions /= distributions.sum(axis=1, keepdims=True)
+            state[rows, i] = choose(distributions, rng)
+            if keep:
+                genes[:, i] += distributions
+
+    genes /= samples
+    return genes, genes @ TRAIT_ARRAY[:, 1]
+
+
+def run_chains(task):
+    """
+    Run one block of independent chains in a worker process.
+    """
+    method, family, chains, samples, burn_in, seed = task
+    rng = np.random.default_rng(seed)
+    if method == "gibbs":
+        return gibbs(family, chains, samples, burn_in, rng)
+    return likelihood_weighting(family, chains, samples, rng)
+
+
+def sample_probabilities(people, method="likelihood", samples=SAMPLES,
+                         chains=CHAINS, burn_in=BURN_IN, processes=None,
+                         seed=None):
+    """
+    Estimate every person's gene and trait distributions given the
+    known traits by likelihood weighting or Gibbs sampling.
+
+    The budget of `samples` is split evenly across `chains` independent
+    chains, which are divided into blocks run in parallel across
+    `processes` worker processes. Return the estimates, as the mean
+    over chains, and their standard errors, both in the same format as
+    heredity's `probabilities`.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown sampling method {method}")
+    if chains < 2:
+        raise ValueError("At least two chains are needed for standard errors")
+    family = compile_family(people)
+    per_chain = max(1, samples // chains)
+
+    blocks = min(chains, processes or os.cpu_count() or 1)
+    seeds = np.random.SeedSequence(seed).spawn(blocks)
+    tasks = [(method, family, len(block), per_chain, burn_in, block_seed)
+             for block, block_seed in zip(np.array_split(range(chains), blocks),
+                                          seeds)]
+    if blocks == 1:
+        results = list(map(run_chains, tasks))
+    else:
+        with Pool(processes) as pool:
+            results = pool.map(run_chains, tasks)
+    genes = np.concatenate([result[0] for result in results])
+    traits = np.concatenate([result[1] for result in results])
+
+    gene_means = genes.mean(axis=0)
+    gene_errors = genes.std(axis=0, ddof=1) / np.sqrt(chains)
+    trait_means = traits.mean(axis=0)
+    trait_errors = traits.std(axis=0, ddof=1) / np.sqrt(chains)
+
+    probabilities = dict()
+    errors = dict()
+    index = {name: i for i, name in enumerate(family["names"])}
+    for name in people:
+        i = index[name]
+        trait = people[name]["trait"]
+        if trait is None:
+            true, error = trait_means[i], trait_errors[i]
+        else:
+            true, error = float(trait), 0.0
+        probabilities[name] = {
+            "gene": {count: gene_means[i, count] for count in (2, 1, 0)},
+            "trait": {True: true, False: 1 - true}
+        }
+        errors[name] = {
+            "gene": {count: gene_errors[i, count] for count in (2, 1, 0)},
+            "trait": {True: error, False: error}
+        }
+    return probabilities, errors
+
+
+if __name__ == "__main__":
+    main()
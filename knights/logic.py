@@ -1,7 +1,54 @@
 import itertools
+import multiprocessing
+import os
+import weakref
+
+# Largest number of symbols model_check evaluates as truth tables,
+# whose 2^n bits take 4 MB at 25 symbols
+TRUTH_TABLE_LIMIT = 25
+
+# Symbols left to each part of parallel_model_check, so workers notice
+# a counter-model found elsewhere within 2^20 models
+PART_SYMBOLS = 20
+
+# Knowledge, query and truth tables shared by a worker's parts
+part_state = None
 
 
 class Sentence():
+    """
+    Sentences are immutable and interned: constructing a sentence equal
+    to one that already exists returns the existing one, keyed by its
+    class and its operands, and each sentence caches its hash, symbols
+    and formula. And is the exception, since
+    conjuncts can be added to it until it is used as an operand.
+    """
+
+    __slots__ = ("_hash", "_symbols", "_formula", "__weakref__")
+
+    # Interned sentences, dropped once nothing else refers to them
+    interned = weakref.WeakValueDictionary()
+
+    @classmethod
+    def create(cls, key):
+        """
+        Returns the interned sentence with `key` and True, or a new
+        sentence to initialize, to be interned under `key`, and False.
+        """
+        sentence = Sentence.interned.get(key)
+        if sentence is not None:
+            return sentence, True
+        sentence = object.__new__(cls)
+        sentence._hash = None
+        sentence._symbols = None
+        sentence._formula = None
+        Sentence.interned[key] = sentence
+        return sentence, False
+
+    def __getstate__(self):
+        # Everything is rebuilt from the constructor arguments,
+        # and cached hashes differ between processes
+        return None
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
@@ -9,17 +56,50 @@ class Sentence():
 
     def formula(self):
         """Returns string formula representing logical sentence."""
+        if self._formula is None:
+            self._formula = self.build_formula()
+        return self._formula
+
+    def build_formula(self):
         return ""
 
     def symbols(self):
         """Returns a set of all symbols in the logical sentence."""
-        return set()
+        return set(self.symbol_set())
+
+    def symbol_set(self):
+        """Returns the cached frozenset of symbols in the sentence."""
+        if self._symbols is None:
+            self._symbols = self.build_symbols()
+        return self._symbols
+
+    def build_symbols(self):
+        return frozenset()
+
+    def truth_table(self, tables, mask):
+        """
+        Evaluates the logical sentence in many models at once.
+        `tables` maps each symbol to an integer whose bit i is the
+        symbol's value in model i, and `mask` has a bit set for every
+        model. Returns an integer of the sentence's values.
+        """
+        raise Exception("nothing to evaluate")
+
+    def freeze(self):
+        """Stops the sentence from changing, once it is an operand."""
 
     @classmethod
     def validate(cls, sentence):
         if not isinstance(sentence, Sentence):
             raise TypeError("must be a logical sentence")
 
+    @classmethod
+    def operand(cls, sentence):
+        """Validates a sentence used as an operand, and freezes it."""
+        cls.validate(sentence)
+        sentence.freeze()
+        return sentence
+
     @classmethod
     def parenthesize(cls, s):
         """Parenthesizes an expression if not already parenthesized."""
@@ -43,15 +123,26 @@ class Sentence():
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
+
+    def __new__(cls, name):
+        sentence, interned = cls.create((cls, name))
+        if not interned:
+            sentence.name = name
+        return sentence
 
-    def __init__(self, name):
-        self.name = name
+    def __getnewargs__(self):
+        return (self.name,)
 
     def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
+        return self is other or (
+            isinstance(other, Symbol) and self.name == other.name
+        )
 
     def __hash__(self):
-        return hash(("symbol", self.name))
+        if self._hash is None:
+            self._hash = hash(("symbol", self.name))
+        return self._hash
 
     def __repr__(self):
         return self.name
@@ -62,23 +153,41 @@ class Symbol(Sentence):
         except KeyError:
             raise Exception(f"variable {self.name} not in model")
 
-    def formula(self):
+    def build_formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
+    def build_symbols(self):
+        return frozenset([self.name])
+
+    def truth_table(self, tables, mask):
+        try:
+            return tables[self.name]
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
 
 
 class Not(Sentence):
-    def __init__(self, operand):
-        Sentence.validate(operand)
-        self.operand = operand
+    __slots__ = ("operand",)
+
+    def __new__(cls, operand):
+        Sentence.operand(operand)
+        sentence, interned = cls.create((cls, operand))
+        if not interned:
+            sentence.operand = operand
+        return sentence
+
+    def __getnewargs__(self):
+        return (self.operand,)
 
     def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+        return self is other or (
+            isinstance(other, Not) and self.operand == other.operand
+        )
 
     def __hash__(self):
-        return hash(("not", hash(self.operand)))
+        if self._hash is None:
+            self._hash = hash(("not", hash(self.operand)))
+        return self._hash
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -86,26 +195,46 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
-    def formula(self):
+    def build_formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
+    def build_symbols(self):
+        return self.operand.symbol_set()
+
+    def truth_table(self, tables, mask):
+        return mask ^ self.operand.truth_table(tables, mask)
 
 
 class And(Sentence):
-    def __init__(self, *conjuncts):
+    __slots__ = ("conjuncts", "frozen")
+
+    def __new__(cls, *conjuncts):
         for conjunct in conjuncts:
-            Sentence.validate(conjunct)
-        self.conjuncts = list(conjuncts)
+            Sentence.operand(conjunct)
+
+        # Not interned, since conjuncts can be added later
+        sentence = object.__new__(cls)
+        sentence._hash = None
+        sentence._symbols = None
+        sentence._formula = None
+        sentence.conjuncts = list(conjuncts)
+        sentence.frozen = False
+        return sentence
+
+    def __getnewargs__(self):
+        return tuple(self.conjuncts)
 
     def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+        return self is other or (
+            isinstance(other, And) and self.conjuncts == other.conjuncts
+        )
 
     def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+        if self._hash is None:
+            self._hash = hash(
+                ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
+            )
+        return self._hash
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -114,35 +243,62 @@ class And(Sentence):
         return f"And({conjunctions})"
 
     def add(self, conjunct):
-        Sentence.validate(conjunct)
+        if self.frozen:
+            raise TypeError("cannot add to a conjunction used as an operand")
+        Sentence.operand(conjunct)
         self.conjuncts.append(conjunct)
+        self._hash = None
+        self._symbols = None
+        self._formula = None
+
+    def freeze(self):
+        self.frozen = True
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
-    def formula(self):
+    def build_formula(self):
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+    def build_symbols(self):
+        return frozenset().union(*[conjunct.symbol_set()
+                                   for conjunct in self.conjuncts])
+
+    def truth_table(self, tables, mask):
+        table = mask
+        for conjunct in self.conjuncts:
+            table &= conjunct.truth_table(tables, mask)
+        return table
 
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
+    __slots__ = ("disjuncts",)
+
+    def __new__(cls, *disjuncts):
         for disjunct in disjuncts:
-            Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
+            Sentence.operand(disjunct)
+        sentence, interned = cls.create((cls,) + disjuncts)
+        if not interned:
+            sentence.disjuncts = disjuncts
+        return sentence
+
+    def __getnewargs__(self):
+        return self.disjuncts
 
     def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+        return self is other or (
+            isinstance(other, Or) and self.disjuncts == other.disjuncts
+        )
 
     def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
+        if self._hash is None:
+            self._hash = hash(
+                ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
+            )
+        return self._hash
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
@@ -151,30 +307,48 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
-    def formula(self):
+    def build_formula(self):
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+    def build_symbols(self):
+        return frozenset().union(*[disjunct.symbol_set()
+                                   for disjunct in self.disjuncts])
+
+    def truth_table(self, tables, mask):
+        table = 0
+        for disjunct in self.disjuncts:
+            table |= disjunct.truth_table(tables, mask)
+        return table
 
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
-        Sentence.validate(antecedent)
-        Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
+    __slots__ = ("antecedent", "consequent")
+
+    def __new__(cls, antecedent, consequent):
+        Sentence.operand(antecedent)
+        Sentence.operand(consequent)
+        sentence, interned = cls.create((cls, antecedent, consequent))
+        if not interned:
+            sentence.antecedent = antecedent
+            sentence.consequent = consequent
+        return sentence
+
+    def __getnewargs__(self):
+        return (self.antecedent, self.consequent)
 
     def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
+        return self is other or (isinstance(other, Implication)
+                                 and self.antecedent == other.antecedent
+                                 and self.consequent == other.consequent)
 
     def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+        if self._hash is None:
+            self._hash = hash(("implies", hash(self.antecedent),
+                               hash(self.consequent)))
+        return self._hash
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -183,29 +357,44 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
-    def formula(self):
+    def build_formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+    def build_symbols(self):
+        return self.antecedent.symbol_set() | self.consequent.symbol_set()
+
+    def truth_table(self, tables, mask):
+        return ((mask ^ self.antecedent.truth_table(tables, mask))
+                | self.consequent.truth_table(tables, mask))
 
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
-        Sentence.validate(left)
-        Sentence.validate(right)
-        self.left = left
-        self.right = right
+    __slots__ = ("left", "right")
+
+    def __new__(cls, left, right):
+        Sentence.operand(left)
+        Sentence.operand(right)
+        sentence, interned = cls.create((cls, left, right))
+        if not interned:
+            sentence.left = left
+            sentence.right = right
+        return sentence
+
+    def __getnewargs__(self):
+        return (self.left, self.right)
 
     def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
+        return self is other or (isinstance(other, Biconditional)
+                                 and self.left == other.left
+                                 and self.right == other.right)
 
     def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+        if self._hash is None:
+            self._hash = hash(("biconditional", hash(self.left),
+                               hash(self.right)))
+        return self._hash
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
@@ -216,13 +405,17 @@ class Biconditional(Sentence):
                 or (not self.left.evaluate(model)
                     and not self.right.evaluate(model)))
 
-    def formula(self):
+    def build_formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
+    def build_symbols(self):
+        return self.left.symbol_set() | self.right.symbol_set()
+
+    def truth_table(self, tables, mask):
+        return mask ^ (self.left.truth_table(tables, mask)
+                       ^ self.right.truth_table(tables, mask))
 
 
 def model_check(knowledge, query):
@@ -259,5 +452,113 @@ def model_check(knowledge, query):
     # Get all symbols in both knowledge and query
     symbols = set.union(knowledge.symbols(), query.symbols())
 
+    # Evaluate every model at once if there are few enough of them:
+    # knowledge entails query unless some model has knowledge true
+    # and query false
+    if len(symbols) <= TRUTH_TABLE_LIMIT:
+        tables, mask = truth_tables(symbols)
+        return not (knowledge.truth_table(tables, mask)
+                    & (mask ^ query.truth_table(tables, mask)))
+
     # Check that knowledge entails query
     return check_all(knowledge, query, symbols, dict())
+
+
+def parallel_model_check(knowledge, query, processes=None, split=None):
+    """
+    Checks if knowledge base entails query, as model_check does, with
+    the models divided between `processes` worker processes. Returns
+    whether it does and how many models were checked.
+
+    Models are split into parts by the values of the first `split`
+    symbols, and each part is evaluated as truth tables over the other
+    symbols. Once any part has a model where knowledge is true and
+    query false, no other part is started, so fewer than all models
+    may be checked.
+    """
+    global part_state
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    workers = processes or os.cpu_count() or 1
+    if split is None:
+        # Enough parts to keep every worker busy
+        split = max(0, len(symbols) - PART_SYMBOLS)
+        while split < len(symbols) and 1 << split < 4 * workers:
+            split += 1
+    elif not 0 <= split <= len(symbols):
+        raise ValueError(f"cannot split on {split} of {len(symbols)} symbols")
+
+    stop = multiprocessing.Event()
+    args = (knowledge, query, symbols[:split], symbols[split:], stop)
+    parts = range(1 << split)
+    if workers == 1:
+        start_parts(*args)
+        try:
+            return collect_parts(map(check_part, parts))
+        finally:
+            # Release the tables, which workers drop when they exit
+            part_state = None
+    with multiprocessing.Pool(workers, initializer=start_parts,
+                              initargs=args) as pool:
+        return collect_parts(pool.imap_unordered(check_part, parts))
+
+
+def start_parts(knowledge, query, prefix, rest, stop):
+    global part_state
+    tables, mask = truth_tables(rest)
+    part_state = (knowledge, query, prefix, tables, mask, stop)
+
+
+def check_part(part):
+    """
+    Returns whether knowledge entails query in every model where the
+    i-th split symbol has the value of bit i of `part`, and how many
+    models were checked, which is none if a counter-model was already
+    found.
+    """
+    knowledge, query, prefix, tables, mask, stop = part_state
+    if stop.is_set():
+        return True, 0
+
+    # Split symbols have the same value in every model of the part
+    tables = dict(tables)
+    for i, symbol in enumerate(prefix):
+        tables[symbol] = mask if part >> i & 1 else 0
+    entailed = not (knowledge.truth_table(tables, mask)
+                    & (mask ^ query.truth_table(tables, mask)))
+    if not entailed:
+        stop.set()
+    return entailed, mask.bit_length()
+
+
+def collect_parts(results):
+    """
+    Returns whether every part entails the query, stopping at the
+    first that does not, and how many models the parts checked.
+    """
+    checked = 0
+    for entailed, models in results:
+        checked += models
+        if not entailed:
+            return False, checked
+    return True, checked
+
+
+def truth_tables(symbols):
+    """
+    Returns a dictionary mapping each symbol to an integer whose bit i
+    is the symbol's value in model i, over all 2^n models of n symbols,
+    and an integer with a bit set for every model.
+    """
+    count = 1 << len(symbols)
+    tables = dict()
+    for i, symbol in enumerate(sorted(symbols)):
+        # Bits alternate between runs of 2^i zeros and 2^i ones,
+        # so double the pattern until it covers every model
+        run = 1 << i
+        table = ((1 << run) - 1) << run
+        width = run << 1
+        while width < count:
+            table |= table << width
+            width <<= 1
+        tables[symbol] = table
+    return tables, (1 << count) - 1
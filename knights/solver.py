@@ -0,0 +1,455 @@
+import heapq
+
+from logic import And, Biconditional, Implication, Not, Or, Sentence, Symbol
+
+
+class CNF():
+    """
+    Compiles logical sentences into clauses in conjunctive normal form.
+
+    Each symbol is numbered from 1, and a clause is a list of literals:
+    v for variable v being true and -v for it being false. Every other
+    subsentence is given a new variable defined to be equivalent to it
+    (the Tseitin transform), so the clauses grow linearly with the
+    sentences rather than exponentially.
+    """
+
+    def __init__(self):
+        self.variables = dict()
+        self.symbols = set()
+        self.definitions = dict()
+        self.clauses = []
+        self.count = 0
+
+    def variable(self, name):
+        """Returns the variable of the symbol called `name`."""
+        if name not in self.variables:
+            self.count += 1
+            self.variables[name] = self.count
+            self.symbols.add(self.count)
+        return self.variables[name]
+
+    def literal(self, sentence):
+        """
+        Returns a literal equivalent to `sentence`, adding clauses
+        that define a variable for it if it has not been seen before.
+        """
+        if isinstance(sentence, Symbol):
+            return self.variable(sentence.name)
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+        if sentence in self.definitions:
+            return self.definitions[sentence]
+
+        if isinstance(sentence, And):
+            parts = [self.literal(conjunct) for conjunct in sentence.conjuncts]
+            x = self.new_variable()
+            for part in parts:
+                self.clauses.append([-x, part])
+            self.clauses.append([x] + [-part for part in parts])
+        elif isinstance(sentence, Or):
+            parts = [self.literal(disjunct) for disjunct in sentence.disjuncts]
+            x = self.new_variable()
+            for part in parts:
+                self.clauses.append([x, -part])
+            self.clauses.append([-x] + parts)
+        elif isinstance(sentence, Implication):
+            a = self.literal(sentence.antecedent)
+            b = self.literal(sentence.consequent)
+            x = self.new_variable()
+            self.clauses.extend([[-x, -a, b], [x, a], [x, -b]])
+        elif isinstance(sentence, Biconditional):
+            a = self.literal(sentence.left)
+            b = self.literal(sentence.right)
+            x = self.new_variable()
+            self.clauses.extend([[-x, -a, b], [-x, a, -b],
+                                 [x, a, b], [x, -a, -b]])
+        else:
+            raise TypeError(f"cannot compile {type(sentence).__name__}")
+        self.definitions[sentence] = x
+        return x
+
+    def new_variable(self):
+        self.count += 1
+        return self.count
+
+    def declare(self, solver, start=1):
+        """
+        Adds every variable from `start` on to `solver`, marking those
+        that stand for subsentences as defined, since they follow from
+        the symbols.
+        """
+        for variable in range(start, self.count + 1):
+            solver.add_variable(variable, decision=variable in self.symbols)
+
+    def add(self, sentence):
+        """Adds clauses asserting that `sentence` is true."""
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            self.clauses.append([self.literal(disjunct)
+                                 for disjunct in sentence.disjuncts])
+        else:
+            self.clauses.append([self.literal(sentence)])
+
+
+class Solver():
+    """
+    CDCL satisfiability solver over integer-literal clauses.
+
+    Unit propagation watches two literals of each clause, so assigning
+    a variable only visits the clauses watching its negation. Each
+    conflict is analyzed back to its first unique implication point,
+    and the learned clause is kept and used to jump back to the level
+    where it becomes unit. Decisions prefer variables that appeared in
+    recent conflicts, reusing each variable's last value, with restarts
+    after a growing number of conflicts.
+
+    Clauses can be added between calls to `solve`, and learned clauses
+    are kept, since they follow from the clauses alone.
+    """
+
+    def __init__(self):
+        self.ok = True
+        self.clauses = []
+        self.learned = []
+        self.watches = dict()
+
+        # The true literals, and the level and reason clause
+        # of each assigned variable
+        self.true = set()
+        self.level = dict()
+        self.reason = dict()
+        self.trail = []
+        self.trail_lim = []
+        self.head = 0
+
+        self.activity = dict()
+        self.increment = 1.0
+        self.phase = dict()
+        self.heap = []
+        self.defined = set()
+        self.model = set()
+
+    def add_variable(self, variable, decision=True):
+        """
+        Adds a variable, which is only chosen for decisions if
+        `decision` is true: variables defined by other variables
+        through their clauses are assigned by propagation.
+        """
+        if variable not in self.activity:
+            self.activity[variable] = 0.0
+            self.phase[variable] = False
+            if decision:
+                heapq.heappush(self.heap, (0.0, variable))
+            else:
+                self.defined.add(variable)
+
+    def value(self, literal):
+        """Returns True or False for an assigned literal, otherwise None."""
+        if literal in self.true:
+            return True
+        if -literal in self.true:
+            return False
+        return None
+
+    def add_clause(self, literals):
+        """
+        Adds a clause, returning False if the clauses are now known
+        to be unsatisfiable.
+        """
+        self.backtrack(0)
+        if not self.ok:
+            return False
+        clause = []
+        for literal in dict.fromkeys(literals):
+            self.add_variable(abs(literal))
+            value = self.value(literal)
+            if value is True or -literal in clause:
+                return True
+            if value is None:
+                clause.append(literal)
+
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self.assign(clause[0], None)
+            self.ok = self.propagate() is None
+        else:
+            self.attach(clause)
+            self.clauses.append(clause)
+        return self.ok
+
+    def attach(self, clause):
+        for literal in clause[:2]:
+            self.watches.setdefault(literal, []).append(clause)
+
+    def assign(self, literal, reason):
+        variable = abs(literal)
+        self.true.add(literal)
+        self.level[variable] = len(self.trail_lim)
+        self.reason[variable] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """
+        Assigns every literal implied by a clause with all its other
+        literals false, returning a clause with all its literals false
+        if there is one, otherwise None.
+        """
+        # Attributes are bound to locals, since this is the inner loop
+        true = self.true
+        watches = self.watches
+        trail = self.trail
+        level = len(self.trail_lim)
+        while self.head < len(trail):
+            false = -trail[self.head]
+            self.head += 1
+            watching = watches.get(false)
+            if not watching:
+                continue
+            kept = []
+            watches[false] = kept
+            for i, clause in enumerate(watching):
+                # Keep the false watched literal second
+                first = clause[0]
+                if first == false:
+                    first = clause[1]
+                    clause[0] = first
+                    clause[1] = false
+                if first in true:
+                    kept.append(clause)
+                    continue
+
+                # Watch another literal that is not false, if there is one
+                for k in range(2, len(clause)):
+                    literal = clause[k]
+                    if -literal not in true:
+                        clause[1] = literal
+                        clause[k] = false
+                        if literal in watches:
+                            watches[literal].append(clause)
+                        else:
+                            watches[literal] = [clause]
+                        break
+                else:
+                    kept.append(clause)
+                    if -first in true:
+                        kept.extend(watching[i + 1:])
+                        self.head = len(trail)
+                        return clause
+                    variable = first if first > 0 else -first
+                    true.add(first)
+                    self.level[variable] = level
+                    self.reason[variable] = clause
+                    trail.append(first)
+        return None
+
+    def analyze(self, conflict):
+        """
+        Returns a clause learned from a conflict, whose first literal is
+        the negation of the first unique implication point, and the
+        level to jump back to, where it becomes unit.
+        """
+        current = len(self.trail_lim)
+        learned = [None]
+        seen = set()
+        pending = 0
+        index = len(self.trail) - 1
+        clause = conflict
+        literal = None
+        while True:
+            for other in clause if literal is None else clause[1:]:
+                variable = abs(other)
+                if variable not in seen and self.level[variable] > 0:
+                    seen.add(variable)
+                    self.bump(variable)
+                    if self.level[variable] == current:
+                        pending += 1
+                    else:
+                        learned.append(other)
+
+            # Resolve with the reason of the latest conflicting literal
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.reason[abs(literal)]
+        learned[0] = -literal
+
+        # Drop literals implied by the others: the negation of each other
+        # literal in their reason is already in the clause, or fixed
+        learned[1:] = [
+            other for other in learned[1:]
+            if self.reason[abs(other)] is None
+            or any(abs(implied) not in seen and self.level[abs(implied)] > 0
+                   for implied in self.reason[abs(other)][1:])
+        ]
+
+        if len(learned) == 1:
+            return learned, 0
+        # Watch the literal assigned latest, which becomes false last
+        latest = max(range(1, len(learned)),
+                     key=lambda i: self.level[abs(learned[i])])
+        learned[1], learned[latest] = learned[latest], learned[1]
+        return learned, self.level[abs(learned[1])]
+
+    def bump(self, variable):
+        self.activity[variable] += self.increment
+        if self.activity[variable] > 1e100:
+            for v in self.activity:
+                self.activity[v] *= 1e-100
+            self.increment *= 1e-100
+            self.heap = [(-self.activity[v], v) for v in self.activity
+                         if v not in self.level and v not in self.defined]
+            heapq.heapify(self.heap)
+
+    def backtrack(self, level):
+        """Unassigns every literal assigned after `level`."""
+        if len(self.trail_lim) <= level:
+            return
+        start = self.trail_lim[level]
+        for literal in self.trail[start:]:
+            variable = abs(literal)
+            self.true.discard(literal)
+            del self.level[variable]
+            del self.reason[variable]
+            self.phase[variable] = literal > 0
+            if variable not in self.defined:
+                heapq.heappush(self.heap, (-self.activity[variable], variable))
+        del self.trail[start:]
+        del self.trail_lim[level:]
+        self.head = start
+
+    def decide(self):
+        """
+        Returns the unassigned variable with the highest activity,
+        or None if every variable is assigned.
+        """
+        while self.heap:
+            activity, variable = heapq.heappop(self.heap)
+            if variable not in self.level and -activity == self.activity[variable]:
+                return variable
+        return None
+
+    def solve(self, assumptions=()):
+        """
+        Returns whether the clauses are satisfiable with every literal
+        in `assumptions` true. If they are, `model` is the set of true
+        literals in a satisfying assignment.
+        """
+        self.backtrack(0)
+        if not self.ok:
+            return False
+        for literal in assumptions:
+            self.add_variable(abs(literal))
+
+        conflicts = 0
+        restart = 100
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                if not self.trail_lim:
+                    self.ok = False
+                    return False
+                learned, level = self.analyze(conflict)
+                self.backtrack(level)
+                if len(learned) == 1:
+                    self.assign(learned[0], None)
+                else:
+                    self.attach(learned)
+                    self.learned.append(learned)
+                    self.assign(learned[0], learned)
+                self.increment /= 0.95
+                conflicts += 1
+                if conflicts == restart:
+                    self.backtrack(0)
+                    restart += int(restart * 1.5)
+                continue
+
+            # Assumptions are the first decisions, one level each
+            level = len(self.trail_lim)
+            if level < len(assumptions):
+                literal = assumptions[level]
+                value = self.value(literal)
+                if value is False:
+                    self.backtrack(0)
+                    return False
+                self.trail_lim.append(len(self.trail))
+                if value is None:
+                    self.assign(literal, None)
+                continue
+
+            variable = self.decide()
+            if variable is None:
+                self.model = set(self.true)
+                self.backtrack(0)
+                return True
+            self.trail_lim.append(len(self.trail))
+            self.assign(variable if self.phase[variable] else -variable, None)
+
+
+class KnowledgeBase():
+    """
+    Knowledge base that answers many queries with one solver.
+
+    Sentences are compiled into clauses as they are added, and each
+    query only compiles itself, then asks whether the knowledge holds
+    with the query false, as an assumption rather than a clause. The
+    solver is never rebuilt, so learned clauses and literals fixed by
+    the knowledge alone carry over from one query to the next.
+
+    Compiled sentences are kept, so any And added or queried is frozen,
+    and adding conjuncts to it later raises TypeError.
+    """
+
+    def __init__(self, *sentences):
+        self.cnf = CNF()
+        self.solver = Solver()
+        self.declared = 0
+        for sentence in sentences:
+            self.add(sentence)
+
+    def add(self, sentence):
+        """
+        Adds `sentence` to the knowledge, freezing it if it is an And,
+        since later conjuncts would not be seen.
+        """
+        self.cnf.add(Sentence.operand(sentence))
+
+    def sync(self):
+        """Passes new variables and clauses on to the solver."""
+        self.cnf.declare(self.solver, self.declared + 1)
+        self.declared = self.cnf.count
+        for clause in self.cnf.clauses:
+            self.solver.add_clause(clause)
+        self.cnf.clauses.clear()
+
+    def entails(self, query):
+        """Checks if the knowledge entails query, freezing it if it is an And."""
+        literal = self.cnf.literal(Sentence.operand(query))
+        self.sync()
+        return not self.solver.solve([-literal])
+
+
+def entails(knowledge, query):
+    """
+    Checks if knowledge base entails query, as model_check does, by
+    checking that knowledge and the negation of query are unsatisfiable.
+    Neither is frozen, since nothing compiled from them is kept.
+    """
+    Sentence.validate(knowledge)
+    Sentence.validate(query)
+    cnf = CNF()
+    cnf.add(knowledge)
+    query = cnf.literal(query)
+    solver = Solver()
+    cnf.declare(solver)
+    for clause in cnf.clauses:
+        if not solver.add_clause(clause):
+            return True
+    return not solver.solve([-query])
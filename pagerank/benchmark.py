@@ -0,0 +1,192 @@
+import argparse
+import datetime
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from pagerank import (DAMPING, SAMPLES, TOLERANCE, crawl, iterate_pagerank,
+                      personalized_pagerank, power_iteration, index_corpus,
+                      sample_pagerank, sample_pagerank_vectorized)
+
+CORPORA = ["corpus0", "corpus1", "corpus2"]
+SIZES = [1000, 10000, 100000]
+
+# Samples taken by the vectorized sampler
+VECTORIZED_SAMPLES = 1000000
+
+# Tolerance of the reference solution every estimate is compared to
+REFERENCE_TOLERANCE = 1e-12
+
+# Largest difference from iterate_pagerank allowed for any page when
+# the vectorized sampler takes the default number of samples
+SAMPLER_TOLERANCE = 0.02
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare PageRank estimators for accuracy and cost."
+    )
+    parser.add_argument("--sizes", type=int, nargs="*", default=SIZES,
+                        help="pages in each synthetic power-law corpus")
+    parser.add_argument("--repeats", type=int, default=3,
+                        help="runs of each sampler, to estimate its error")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed for the synthetic corpora and samplers")
+    parser.add_argument("--output", default="benchmark.json",
+                        help="JSON report to write (default: benchmark.json)")
+    args = parser.parse_args()
+
+    corpora = [(name, crawl(name)) for name in CORPORA]
+    for name, corpus in corpora:
+        check_sampler(name, corpus, args.seed)
+    corpora += [(f"power-law-{size}", power_law_corpus(size, args.seed))
+                for size in args.sizes]
+
+    results = []
+    print(f"{'corpus':<20}{'estimator':<22}{'iterations':>11}"
+          f"{'seconds':>10}{'peak MB':>10}{'L1 error':>12}")
+    for name, corpus in corpora:
+        reference = reference_ranks(corpus)
+        for estimator, run in ESTIMATORS.items():
+            result = measure(run, corpus, reference, args.repeats
+                             if estimator in SAMPLERS else 1)
+            result.update({
+                "corpus": name,
+                "pages": len(corpus),
+                "links": sum(len(links) for links in corpus.values()),
+                "estimator": estimator
+            })
+            results.append(result)
+            iterations = result.get("iterations", "")
+            print(f"{name:<20}{estimator:<22}{iterations:>11}"
+                  f"{result['seconds']:>10.3f}"
+                  f"{result['peak_bytes'] / 2 ** 20:>10.1f}"
+                  f"{result['l1']:>12.2e}")
+
+    report = {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "damping": DAMPING,
+        "results": results
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+
+def sample(corpus, stats):
+    return sample_pagerank(corpus, DAMPING, SAMPLES)
+
+
+def sample_vectorized(corpus, stats):
+    return sample_pagerank_vectorized(corpus, DAMPING, VECTORIZED_SAMPLES)
+
+
+def iterate(corpus, stats):
+    return iterate_pagerank(corpus, DAMPING, stats=stats)
+
+
+def personalized_uniform(corpus, stats):
+    teleports = {"uniform": list(corpus)}
+    return personalized_pagerank(corpus, DAMPING, teleports,
+                                 stats=stats)["uniform"]
+
+
+# Estimators to compare, each called with a corpus and a stats dictionary
+ESTIMATORS = {
+    "sample": sample,
+    "sample_vectorized": sample_vectorized,
+    "iterate": iterate,
+    "personalized_uniform": personalized_uniform,
+}
+SAMPLERS = {"sample", "sample_vectorized"}
+
+
+def measure(run, corpus, reference, repeats):
+    """
+    Run an estimator `repeats` times, returning its mean wall time,
+    peak memory from a separate traced run, iterations and residuals
+    if it reports them, and its mean L1 distance to `reference`, with
+    the standard deviation across runs as an error estimate.
+    """
+    seconds = []
+    errors = []
+    for _ in range(repeats):
+        stats = dict()
+        start = time.perf_counter()
+        ranks = run(corpus, stats)
+        seconds.append(time.perf_counter() - start)
+        errors.append(sum(abs(ranks.get(page, 0) - reference[page])
+                          for page in reference))
+
+    # Trace memory separately, since tracing slows down Python code
+    tracemalloc.start()
+    run(corpus, dict())
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    result = {
+        "seconds": statistics.mean(seconds),
+        "peak_bytes": peak,
+        "l1": statistics.mean(errors),
+        "l1_stdev": statistics.stdev(errors) if repeats > 1 else 0.0
+    }
+    if "iterations" in stats:
+        result["iterations"] = stats["iterations"]
+        result["residuals"] = stats["residuals"]
+    return result
+
+
+def check_sampler(name, corpus, seed):
+    """
+    Exit unless the vectorized sampler, taking the default number of
+    samples, agrees with iterate_pagerank on every page of `corpus`.
+    """
+    expected = iterate_pagerank(corpus, DAMPING, TOLERANCE)
+    ranks = sample_pagerank_vectorized(corpus, DAMPING, SAMPLES, seed=seed)
+    error = max(abs(ranks[page] - expected[page]) for page in corpus)
+    print(f"{name}: vectorized sampler within {error:.4f} of iteration")
+    if error > SAMPLER_TOLERANCE:
+        sys.exit(f"{name}: vectorized sampler differs from iteration "
+                 f"by {error:.4f}, more than {SAMPLER_TOLERANCE}")
+
+
+def reference_ranks(corpus):
+    """
+    Return high-precision PageRank values to measure estimates against.
+    """
+    pages, offsets, links = index_corpus(corpus)
+    ranks = power_iteration(offsets, links, DAMPING, REFERENCE_TOLERANCE)
+    return dict(zip(pages, ranks.tolist()))
+
+
+def power_law_corpus(num_pages, seed=0):
+    """
+    Return a synthetic corpus of `num_pages` pages whose number of
+    links and popularity as a link target both follow power laws.
+    Some pages have no links.
+    """
+    rng = np.random.default_rng(seed)
+    pages = [f"{i}.html" for i in range(num_pages)]
+    outdegree = np.minimum(rng.zipf(2.0, num_pages) - 1, num_pages - 1)
+    popularity = 1 / np.arange(1, num_pages + 1) ** 0.8
+    popularity = rng.permutation(popularity / popularity.sum())
+    targets = rng.choice(num_pages, size=outdegree.sum(), p=popularity)
+
+    corpus = dict()
+    start = 0
+    for i, page in enumerate(pages):
+        links = targets[start:start + outdegree[i]]
+        start += outdegree[i]
+        corpus[page] = {pages[link] for link in links.tolist()} - {page}
+    return corpus
+
+
+if __name__ == "__main__":
+    main()
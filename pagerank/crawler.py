@@ -0,0 +1,148 @@
+import os
+import sys
+from html.parser import HTMLParser
+from multiprocessing import Pool
+
+import numpy as np
+
+# Bytes read from a file at a time
+CHUNK_SIZE = 1 << 16
+
+# Files handed to a worker process at a time
+BATCH_SIZE = 256
+
+# Below this many pages, crawling in one process is faster
+PARALLEL_THRESHOLD = 2048
+
+
+class LinkParser(HTMLParser):
+    """
+    Incremental HTML tokenizer collecting the href of every <a> tag.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.links = set()
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            for name, value in attrs:
+                if name == "href" and value is not None:
+                    self.links.add(value)
+
+
+def extract_links(path):
+    """
+    Return the set of links in an HTML file,
+    feeding it to the tokenizer a chunk at a time.
+    """
+    parser = LinkParser()
+    with open(path, encoding="utf-8", errors="replace") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            parser.feed(chunk)
+    parser.close()
+    return parser.links
+
+
+# Maps page names to indices in each worker process
+page_index = dict()
+
+
+def set_page_index(pages):
+    global page_index
+    page_index = {page: i for i, page in enumerate(pages)}
+
+
+def crawl_batch(batch):
+    """
+    Given (directory, filenames), return a list of (page, links) pairs
+    where `links` is an int32 array of the indices of the other
+    corpus pages the page links to.
+    """
+    directory, filenames = batch
+    results = []
+    for filename in filenames:
+        page = page_index[filename]
+        links = {page_index[link]
+                 for link in extract_links(os.path.join(directory, filename))
+                 if link in page_index} - {page}
+        results.append((page, np.array(sorted(links), dtype=np.int32)))
+    return results
+
+
+def crawl_graph(directory, processes=None, edge_file=None):
+    """
+    Parse a directory of HTML pages into a compact link graph.
+
+    Return (pages, offsets, links) as from pagerank.index_corpus:
+    the pages linked to by pages[i] are links[offsets[i]:offsets[i + 1]].
+    Files are parsed in batches across `processes` worker processes.
+    If `edge_file` is given, every link is also written there as it is
+    found, as a pair of native int32 (page, linked page) indices.
+    """
+    pages = sorted(entry.name for entry in os.scandir(directory)
+                   if entry.name.endswith(".html"))
+    batches = [(directory, pages[i:i + BATCH_SIZE])
+               for i in range(0, len(pages), BATCH_SIZE)]
+
+    outlinks = [None] * len(pages)
+    edges = open(edge_file, "wb") if edge_file else None
+    pool = None
+    try:
+        if processes == 1 or len(pages) < PARALLEL_THRESHOLD:
+            set_page_index(pages)
+            results = map(crawl_batch, batches)
+        else:
+            pool = Pool(processes, initializer=set_page_index,
+                        initargs=(pages,))
+            results = pool.imap_unordered(crawl_batch, batches)
+
+        for batch in results:
+            for page, links in batch:
+                outlinks[page] = links
+                if edges is not None:
+                    pairs = np.empty((len(links), 2), dtype=np.int32)
+                    pairs[:, 0] = page
+                    pairs[:, 1] = links
+                    pairs.tofile(edges)
+        if pool is not None:
+            pool.close()
+            pool.join()
+    finally:
+        # Stop the workers if parsing or writing the edges failed
+        if pool is not None:
+            pool.terminate()
+        if edges is not None:
+            edges.close()
+
+    offsets = np.zeros(len(pages) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(links) for links in outlinks])
+    links = (np.concatenate(outlinks).astype(np.int64) if pages
+             else np.zeros(0, dtype=np.int64))
+    return pages, offsets, links
+
+
+def load_edges(edge_file, num_pages):
+    """
+    Return (offsets, links) for `num_pages` pages from an edge file
+    written by crawl_graph.
+    """
+    pairs = np.fromfile(edge_file, dtype=np.int32).reshape(-1, 2)
+    pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+    offsets = np.zeros(num_pages + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(pairs[:, 0], minlength=num_pages))
+    return offsets, pairs[:, 1].astype(np.int64)
+
+
+def main():
+    if len(sys.argv) != 3:
+        sys.exit("Usage: python crawler.py corpus edges")
+    pages, offsets, links = crawl_graph(sys.argv[1], edge_file=sys.argv[2])
+    with open(f"{sys.argv[2]}.pages", "w") as f:
+        for page in pages:
+            f.write(f"{page}\n")
+    print(f"Crawled {len(pages)} pages with {len(links)} links.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+
+from crawler import extract_links
+from pagerank import DAMPING, TOLERANCE, power_iteration
+
+
+def main():
+    if len(sys.argv) != 3:
+        sys.exit("Usage: python incremental.py corpus state.json")
+    ranks, summary = refresh(sys.argv[1], sys.argv[2])
+    print(f"{summary['unchanged']} unchanged, {summary['changed']} changed, "
+          f"{summary['added']} added, {summary['removed']} removed pages; "
+          f"converged in {summary['iterations']} iterations")
+    for page in sorted(ranks):
+        print(f"  {page}: {ranks[page]:.4f}")
+
+
+def refresh(directory, state_file, damping_factor=DAMPING,
+            tolerance=TOLERANCE):
+    """
+    Update the PageRank of the corpus in `directory` using the state
+    saved in `state_file` by a previous refresh, then save the new state.
+
+    Only files whose size and modification time changed are read, and
+    only those whose content hash changed are parsed again. Power
+    iteration starts from the previous ranks. Return a dictionary of
+    ranks, and a summary of how many pages changed and how many
+    iterations were needed.
+    """
+    state = load_state(state_file)
+    previous = state["pages"]
+    summary = {"unchanged": 0, "changed": 0, "added": 0, "removed": 0}
+
+    # Re-crawl only files that changed since the last refresh
+    pages = dict()
+    for entry in os.scandir(directory):
+        if not entry.name.endswith(".html"):
+            continue
+        stat = entry.stat()
+        record = previous.get(entry.name)
+        if (record is not None and record["size"] == stat.st_size
+                and record["mtime"] == stat.st_mtime_ns):
+            pages[entry.name] = record
+            summary["unchanged"] += 1
+            continue
+
+        with open(entry.path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        if record is not None and record["hash"] == digest:
+            links = record["links"]
+            summary["unchanged"] += 1
+        else:
+            links = sorted(extract_links(entry.path))
+            summary["changed" if record is not None else "added"] += 1
+        pages[entry.name] = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "hash": digest,
+            "links": links
+        }
+    summary["removed"] = len(set(previous) - set(pages))
+
+    # Patch the link graph: links are kept unfiltered, so a link to a
+    # page that appears later becomes part of the graph
+    names = sorted(pages)
+    index = {page: i for i, page in enumerate(names)}
+    offsets = np.zeros(len(names) + 1, dtype=np.int64)
+    links = []
+    for i, page in enumerate(names):
+        targets = {index[link] for link in pages[page]["links"]
+                   if link in index} - {i}
+        offsets[i + 1] = offsets[i] + len(targets)
+        links.extend(sorted(targets))
+    links = np.array(links, dtype=np.int64)
+
+    # Warm start from the previous ranks, giving new pages 1 / N
+    start = np.array([state["ranks"].get(page, 1 / len(names))
+                      for page in names])
+    stats = dict()
+    ranks = power_iteration(offsets, links, damping_factor, tolerance,
+                            start=start, stats=stats)
+    summary["iterations"] = stats["iterations"]
+
+    ranks = dict(zip(names, ranks.tolist()))
+    save_state(state_file, {"pages": pages, "ranks": ranks})
+    return ranks, summary
+
+
+def load_state(state_file):
+    """
+    Return the state saved by a previous refresh, or an empty state.
+    """
+    if not os.path.exists(state_file):
+        return {"pages": dict(), "ranks": dict()}
+    with open(state_file) as f:
+        return json.load(f)
+
+
+def save_state(state_file, state):
+    """
+    Save the state atomically, so an interrupted refresh
+    leaves the previous state intact.
+    """
+    temporary = f"{state_file}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(state, f)
+    os.replace(temporary, state_file)
+
+
+if __name__ == "__main__":
+    main()
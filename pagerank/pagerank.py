@@ -1,21 +1,36 @@
-import os
+import itertools
 import random
-import re
 import sys
 
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from crawler import crawl_graph
+
 DAMPING = 0.85
 SAMPLES = 10000
 
+# Largest L1 change between iterations at which power iteration stops,
+# which bounds the total error however many pages share the rank
+TOLERANCE = 0.001
+SURFERS = 10000
+
+# Steps each vectorized surfer takes before its visits are counted,
+# so its uniformly random starting page is forgotten: after k steps
+# the start still carries weight at most 0.85^k
+BURN_IN = 100
+
 
 def main():
     if len(sys.argv) != 2:
         sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
+    graph = crawl_graph(sys.argv[1])
+    corpus = graph_corpus(graph)
     ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
     print(f"PageRank Results from Sampling (n = {SAMPLES})")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
-    ranks = iterate_pagerank(corpus, DAMPING)
+    ranks = iterate_graph(graph, DAMPING)
     print(f"PageRank Results from Iteration")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
@@ -32,25 +47,19 @@ def crawl(directory):
                   ,,,
                   }
     """
-    pages = dict()
-
-    # Extract all links from HTML files
-    for filename in os.listdir(directory):
-        if not filename.endswith(".html"):
-            continue
-        with open(os.path.join(directory, filename)) as f:
-            contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
-            pages[filename] = set(links) - {filename}
+    return graph_corpus(crawl_graph(directory))
 
-    # Only include links to other pages in the corpus
-    for filename in pages:
-        pages[filename] = set(
-            link for link in pages[filename]
-            if link in pages
-        )
 
-    return pages
+def graph_corpus(graph):
+    """
+    Return the corpus dictionary of a link graph given as
+    (pages, offsets, links), as returned by crawler.crawl_graph.
+    """
+    pages, offsets, links = graph
+    return {
+        page: {pages[link] for link in links[offsets[i]:offsets[i + 1]]}
+        for i, page in enumerate(pages)
+    }
 
 
 def transition_model(corpus, page, damping_factor):
@@ -104,35 +113,70 @@ def sample_pagerank(corpus, damping_factor, n):
     PageRank values should sum to 1.
     """
 
-    # The first sample is generated by choosing from a page at random.
-    page = random.choice(list(corpus))
+    # Follow the transition model without building its distribution:
+    # each page's links are listed once, and each step is a damping
+    # coin flip followed by one uniform choice
+    pages = list(corpus)
+    links = {page: list(corpus[page]) for page in pages}
+    visits = dict.fromkeys(pages, 0)
 
-    pageranks = dict()
+    # The first sample is generated by choosing from a page at random.
+    page = random.choice(pages)
 
     for i in range(n):
-
-        if page in pageranks:
-            pageranks[page] = pageranks[page] + 1
+        visits[page] += 1
+        if links[page] and random.random() < damping_factor:
+            page = random.choice(links[page])
         else:
-            pageranks[page] = 1
+            page = random.choice(pages)
 
-        sample = transition_model(corpus, page, damping_factor)
+    # convert visits to probability
+    return {page: count / n for page, count in visits.items()}
 
-        # keys stand for all pages, and values stand for probability distribution
-        keys = list(sample)
-        values = list(sample.values())
 
-        # Based on the probability distribution from pervious page, we chose the next page
-        page = random.choices(keys, values)[0]
-
-    # convert pageranks to probility
-    for page in list(pageranks.copy()):
-        pageranks[page] = pageranks[page]/n
-
-    return pageranks
-
-
-def iterate_pagerank(corpus, damping_factor):
+def sample_pagerank_vectorized(corpus, damping_factor, n,
+                               surfers=SURFERS, burn_in=BURN_IN, seed=None):
+    """
+    Return PageRank values for each page like sample_pagerank, but
+    advance `surfers` independent random surfers at once with NumPy,
+    taking `n` samples in total. Each surfer first takes `burn_in`
+    uncounted steps from its random starting page, so the samples
+    follow PageRank however few steps each surfer counts.
+    """
+    pages, offsets, links = index_corpus(corpus)
+    num_all = len(pages)
+    outdegree = np.diff(offsets)
+    rng = np.random.default_rng(seed)
+
+    def step(current):
+        # Surfers on pages with links follow one with probability damping,
+        # everyone else jumps to a page chosen uniformly at random
+        follow = ((rng.random(len(current)) < damping_factor)
+                  & (outdegree[current] > 0))
+        following = current[follow]
+        choice = (rng.random(len(following))
+                  * outdegree[following]).astype(np.int64)
+        current = rng.integers(num_all, size=len(current))
+        current[follow] = links[offsets[following] + choice]
+        return current
+
+    current = rng.integers(num_all, size=min(surfers, n))
+    for _ in range(burn_in):
+        current = step(current)
+
+    visits = np.zeros(num_all, dtype=np.int64)
+    taken = 0
+    while taken < n:
+        current = current[:n - taken]
+        visits += np.bincount(current, minlength=num_all)
+        taken += len(current)
+        current = step(current)
+
+    return dict(zip(pages, (visits / n).tolist()))
+
+
+def iterate_pagerank(corpus, damping_factor, tolerance=TOLERANCE,
+                     stats=None):
     """
     Return PageRank values for each page by iteratively updating
     PageRank values until convergence.
@@ -140,44 +184,180 @@ def iterate_pagerank(corpus, damping_factor):
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
+
+    Iteration stops once the PageRank values change by less than
+    `tolerance` in total. `stats` is passed to power_iteration.
     """
+    return iterate_graph(index_corpus(corpus), damping_factor, tolerance,
+                         stats)
 
-    num_all = len(corpus)
-    pageranks = dict()
 
-    #  Start by assuming the PageRank of every page is 1 / N
-    for page in list(corpus):
-        pageranks[page] = [1/num_all]
+def iterate_graph(graph, damping_factor, tolerance=TOLERANCE, stats=None):
+    """
+    Return PageRank values like iterate_pagerank for a link graph
+    given as (pages, offsets, links), as returned by index_corpus or
+    directly by crawler.crawl_graph, without building a corpus.
+    """
+    pages, offsets, links = graph
+    ranks = power_iteration(offsets, links, damping_factor, tolerance,
+                            stats=stats)
+    return dict(zip(pages, ranks.tolist()))
 
-    while True:
-        for page in list(corpus):
 
-            total = 0
+def index_corpus(corpus):
+    """
+    Return (pages, offsets, links) describing `corpus` as integers:
+    `pages` lists the page names, and the pages linked to by page i
+    are links[offsets[i]:offsets[i + 1]], as indices into `pages`.
+    """
+    pages = sorted(corpus)
+    num_all = len(pages)
+    index = {page: i for i, page in enumerate(pages)}
+    counts = np.fromiter(map(len, map(corpus.get, pages)), dtype=np.int64,
+                         count=num_all)
+    sources = np.repeat(np.arange(num_all), counts)
+    links = np.fromiter(
+        map(index.get, itertools.chain.from_iterable(map(corpus.get, pages)),
+            itertools.repeat(-1)),
+        dtype=np.int64, count=len(sources)
+    )
+
+    # Drop links to pages outside the corpus, then sort each page's
+    # links, since the sets in `corpus` have no order
+    known = links >= 0
+    keys = np.sort(sources[known] * num_all + links[known])
+    offsets = np.zeros(num_all + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys // num_all, minlength=num_all),
+              out=offsets[1:])
+    return pages, offsets, keys % max(num_all, 1)
+
+
+def transition_matrix(offsets, links):
+    """
+    Return the sparse transition matrix of a link graph, transposed so
+    that multiplying it by the ranks moves rank along every link, and
+    an array marking pages with no links, which are treated as
+    linking to every page in the corpus.
+    """
+    num_all = len(offsets) - 1
+    outdegree = np.diff(offsets)
+    weights = np.repeat(1 / np.maximum(outdegree, 1), outdegree)
+    matrix = csr_matrix((weights, links, offsets), shape=(num_all, num_all))
+    return matrix.T.tocsr(), outdegree == 0
 
-            # add all i in formulate
-            for key, values in corpus.items():
-                if page in values:
-                    total = total + pageranks[key][-1]/len(values)
 
-            # add updated PR(p) in pageranks list
-            pageranks[page].append((1-damping_factor)/num_all + damping_factor*total)
+def power_iteration(offsets, links, damping_factor, tolerance=TOLERANCE,
+                    start=None, stats=None):
+    """
+    Return an array of PageRank values for the link graph given by
+    `offsets` and `links` (see index_corpus), by power iteration on
+    its transition matrix until the values change by less than
+    `tolerance` in total.
+
+    Iteration starts from the array `start` if given, such as the
+    ranks of a previous version of the corpus. If `stats` is a
+    dictionary, the number of iterations is stored in stats["iterations"]
+    and the L1 change in each iteration in stats["residuals"].
+    """
+    num_all = len(offsets) - 1
+    flows, dangling = transition_matrix(offsets, links)
+    stats = stats if stats is not None else dict()
+    stats["iterations"] = 0
+    stats["residuals"] = []
+
+    #  Start by assuming the PageRank of every page is 1 / N
+    if start is None:
+        ranks = np.full(num_all, 1 / num_all)
+    else:
+        ranks = np.asarray(start, dtype=float) / np.sum(start)
 
-        change = 0
+    while True:
+        stats["iterations"] += 1
 
-        #check if change > 0.001
-        for value in pageranks.values():
-            if abs(value[-2] - value[-1]) > change:
-                change = abs(value[-2] - value[-1])
+        # Rank flowing along each link, plus rank spread evenly by dangling pages
+        spread = flows @ ranks
+        spread += ranks[dangling].sum() / num_all
+        updated = (1 - damping_factor) / num_all + damping_factor * spread
 
-        if change < 0.001:
-            break
+        change = np.abs(updated - ranks).sum()
+        stats["residuals"].append(float(change))
+        ranks = updated
+        if change < tolerance:
+            return ranks
 
 
-    # only select the latest value in the list
-    for page in pageranks:
-        pageranks[page] = pageranks[page][-1]
+def personalized_pagerank(corpus, damping_factor, teleports,
+                          tolerance=TOLERANCE, stats=None):
+    """
+    Return personalized PageRank values for many teleport vectors at once.
+
+    `teleports` maps a name, such as a topic, to the pages a surfer
+    jumps to with probability `1 - damping_factor`: either a collection
+    of seed pages, chosen uniformly, or a dictionary of page weights.
+    Return a dictionary mapping each name to a dictionary of PageRank
+    values for every page in the corpus. `stats` is passed to
+    personalized_iteration.
+    """
+    pages, offsets, links = index_corpus(corpus)
+    index = {page: i for i, page in enumerate(pages)}
+    names = list(teleports)
+
+    # One column of teleport probabilities per name
+    teleport = np.zeros((len(pages), len(names)))
+    for k, name in enumerate(names):
+        weights = teleports[name]
+        if not isinstance(weights, dict):
+            weights = dict.fromkeys(weights, 1)
+        for page, weight in weights.items():
+            teleport[index[page], k] = weight
+    totals = teleport.sum(axis=0)
+    if (totals <= 0).any():
+        raise ValueError("every teleport vector needs a page with weight")
+    teleport /= totals
+
+    ranks = personalized_iteration(offsets, links, damping_factor,
+                                   teleport, tolerance, stats)
+    return {
+        name: dict(zip(pages, ranks[:, k].tolist()))
+        for k, name in enumerate(names)
+    }
+
+
+def personalized_iteration(offsets, links, damping_factor, teleport,
+                           tolerance=TOLERANCE, stats=None):
+    """
+    Return an (N, K) array of PageRank values, one column for each of
+    the K columns of the (N, K) `teleport` array, by power iteration on
+    all columns together.
+
+    Each iteration multiplies every column by the sparse transition
+    matrix in a single sparse-dense matrix product. Rank on dangling
+    pages is spread like each column's teleport vector, so a uniform
+    teleport vector gives the same result as power_iteration.
+    `stats` is filled in as by power_iteration.
+    """
+    num_all, columns = teleport.shape
+    stats = stats if stats is not None else dict()
+    stats["iterations"] = 0
+    stats["residuals"] = []
+    flows, dangling = transition_matrix(offsets, links)
 
-    return pageranks
+    ranks = np.full((num_all, columns), 1 / num_all)
+    while True:
+        stats["iterations"] += 1
+        updated = flows @ ranks
+
+        # Teleport, plus rank on dangling pages, follows each column's vector
+        updated *= damping_factor
+        mass = damping_factor * ranks[dangling].sum(axis=0) + 1 - damping_factor
+        updated += teleport * mass
+
+        # Stop once every column has converged
+        change = np.abs(updated - ranks).sum(axis=0).max()
+        stats["residuals"].append(float(change))
+        ranks = updated
+        if change < tolerance:
+            return ranks
 
 
 if __name__ == "__main__":